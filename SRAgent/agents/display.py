@@ -8,6 +8,9 @@ from rich.panel import Panel
 from rich.markdown import Markdown
 from SRAgent.agents.utils import set_model
 
+# content='...' wrapper in stringified messages
+MESSAGE_CONTENT_REGEX = re.compile(r"content='(.*?)'", re.DOTALL)
+
 
 # functions
 def create_step_summary_chain(
@@ -54,7 +57,7 @@ def format_agent_message(message_content: str, agent_name: str) -> str:
     content = message_content.strip()
 
     # extract content from message_content if complex string
-    match = re.search(r"content='(.*?)'", str(message_content), re.DOTALL)
+    match = MESSAGE_CONTENT_REGEX.search(str(message_content))
     if match:
         content = match.group(1)
 
@@ -33,6 +33,7 @@ def create_elink_agent(model_name: Optional[str] = None) -> Callable:
                 " - elink requires Entrez IDs; if you are provided with SRA or GEO accessions, simply state that you need the Entrez IDs.",
                 " - If you are unsure of which database(s) to query (e.g., sra or gds), you can use which_entrez_databases to determine which databases contain the Entrez ID.",
                 " - Note that elink results are composed of Entrez IDs and not accessions (e.g., SRA accessions).",
+                " - If you have multiple Entrez IDs for the same source and target databases, provide them all in a single elink call instead of one call per ID.",
                 "# Response",
                 " - Base your response on the evidence you found; do not infer information.",
                 " - Provide a concise summary of your findings; use lists when possible; do not include helpful wording.",
@@ -3,16 +3,21 @@
 from __future__ import annotations
 import os
 import re
+import sys
 import asyncio
+import http.client
+import operator
 from pathlib import Path
-from typing import Annotated, Any, Callable
+from typing import Annotated, Any, Callable, Sequence, TypedDict
 
 ## 3rd party
 from Bio import Entrez
 from pydantic import BaseModel, Field
 from langchain_core.tools import tool
-from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
 from langchain_core.runnables.config import RunnableConfig
+from langgraph.graph import START, END, StateGraph
+from langgraph.errors import GraphRecursionError
 from langgraph.prebuilt import create_react_agent
 
 ## package
@@ -22,6 +27,51 @@ from SRAgent.agents.esummary import create_esummary_agent
 from SRAgent.agents.efetch import create_efetch_agent
 from SRAgent.agents.elink import create_elink_agent
 from SRAgent.tools.papers import download_paper_by_doi
+from SRAgent.tools.utils import set_entrez_access
+
+# regex patterns for parsing sub-agent responses
+ENTREZ_ID_REGEX = re.compile(r"\b\d{6,}\b")
+DOI_REGEX = re.compile(r"10\.\d{4,}/[^\s\]]+")
+
+# errors expected from Entrez elink: network/HTTP errors, NCBI <ERROR> responses (RuntimeError), and bad XML
+ELINK_ERRORS = (
+    OSError,
+    http.client.HTTPException,
+    RuntimeError,
+    Entrez.Parser.NotXMLError,
+    Entrez.Parser.CorruptedXMLError,
+    Entrez.Parser.ValidationError,
+)
+
+# wall-clock cap (seconds) on the ReAct fallback agent
+REACT_AGENT_TIMEOUT = 300
+
+# max PubMed IDs with DOI lookups (efetch/esummary sub-agent runs) in flight at once;
+# one limiter is shared by all accessions processed with the same papers agent
+ENTREZ_MAX_CONCURRENCY = 3
+
+
+# state modifier for the papers agent
+STATE_MOD = "\n".join(
+    [
+        "# Role and Purpose",
+        " - You are an expert bioinformatician finding the PubMed publications (and their DOIs) for an SRA accession",
+        "# Sub-Agents",
+        " - esearch_agent: find Entrez IDs for accessions or search terms (e.g., database=sra)",
+        " - elink_agent: link Entrez IDs between databases (e.g., dbfrom=sra, db=pubmed); input and output are Entrez IDs, not accessions",
+        " - efetch_agent: fetch full records; best for extracting DOIs (database=pubmed, rettype=xml)",
+        " - esummary_agent: fetch record summaries; fallback for DOIs missed by efetch",
+        " - efetch_agent and esummary_agent can use the which_entrez_databases tool if unsure of the database",
+        "# Workflow",
+        " 1. Convert the SRA accession to an Entrez ID with esearch_agent",
+        " 2. Find linked PubMed Entrez IDs with elink_agent",
+        " 3. For each PubMed ID, extract the DOI with efetch_agent, then esummary_agent if needed",
+        " 4. Return the accession and its publications (PubMed ID + DOI)",
+        "# Notes",
+        " - If esearch finds no Entrez ID or elink finds no PubMed links, return an empty publications list",
+        " - Not all PubMed records have DOIs; set doi=None for those",
+    ]
+)
 
 
 # ============================================================================
@@ -45,14 +95,96 @@ class PublicationsResult(BaseModel):
     )
 
 
+class PapersState(TypedDict):
+    """Shared state of the papers graph."""
+
+    messages: Annotated[Sequence[BaseMessage], operator.add]
+    accession: str
+    pubmed_ids: list[str] | None
+    structured_response: PublicationsResult | None
+    error: str | None
+
+
 # ============================================================================
 # Helper Functions
 # ============================================================================
 
 
+def _search_doi(content: str) -> str | None:
+    """
+    Find the first DOI in a sub-agent response.
+
+    Args:
+        content: Response text
+
+    Returns:
+        The DOI (trailing punctuation removed), or None if not found
+    """
+    doi_match = DOI_REGEX.search(content)
+    if doi_match:
+        return doi_match.group().rstrip(".,;)")
+    return None
+
+
+def _parse_publications(result: dict[str, Any]) -> list[tuple[str | None, str | None]]:
+    """
+    Get the publications from a papers agent result.
+    Handles the structured response as a PublicationsResult or a dict.
+
+    Args:
+        result: Output of the papers agent
+
+    Returns:
+        List of (pubmed_id, doi) tuples; either value may be None
+    """
+    pubs_result = result.get("structured_response")
+    if isinstance(pubs_result, PublicationsResult):
+        publications = pubs_result.publications
+    elif isinstance(pubs_result, dict):
+        publications = pubs_result.get("publications", [])
+    else:
+        return []
+
+    parsed = []
+    for pub in publications:
+        if isinstance(pub, dict):
+            parsed.append((pub.get("pubmed_id"), pub.get("doi")))
+        else:
+            parsed.append(
+                (getattr(pub, "pubmed_id", None), getattr(pub, "doi", None))
+            )
+    return parsed
+
+
+def _elink_pubmed_ids(entrez_id: str) -> list[str]:
+    """
+    Get the PubMed IDs linked to an SRA Entrez ID via Entrez elink.
+    Only the LinkSetDb links are read; the IdList (which echoes the query ID) is skipped.
+
+    Args:
+        entrez_id: SRA Entrez ID
+
+    Returns:
+        List of linked PubMed IDs
+    """
+    set_entrez_access()
+    handle = Entrez.elink(dbfrom="sra", db="pubmed", id=entrez_id)
+    try:
+        record = Entrez.read(handle)
+    finally:
+        handle.close()
+
+    pubmed_ids = []
+    for linkset in record:
+        for linkset_db in linkset.get("LinkSetDb", []):
+            if linkset_db.get("DbTo") != "pubmed":
+                continue
+            pubmed_ids.extend(str(link["Id"]) for link in linkset_db.get("Link", []))
+    return pubmed_ids
+
+
 async def _find_publications_for_accession(
     accession: str,
-    elink_agent: Callable,
     esearch_agent: Callable,
     config: RunnableConfig,
 ) -> list[str]:
@@ -61,12 +193,12 @@ async def _find_publications_for_accession(
 
     Args:
         accession: SRA accession (SRX or SRP)
-        elink_agent: elink agent tool
         esearch_agent: esearch agent tool
         config: Runnable config
 
     Returns:
-        List of PubMed Entrez IDs
+        List of PubMed Entrez IDs (empty if elink found no links),
+        or None if no Entrez ID was found or elink failed
     """
     # Step 1: Convert accession to Entrez ID if needed
     entrez_id = None
@@ -77,22 +209,26 @@ async def _find_publications_for_accession(
 
     # Extract Entrez ID from response
     content = result["messages"][-1].content
-    id_match = re.search(r"\b\d{6,}\b", content)
+    id_match = ENTREZ_ID_REGEX.search(content)
     if id_match:
         entrez_id = id_match.group()
 
     if not entrez_id:
-        return []
+        return None
 
     # Step 2: Use elink to find associated PubMed IDs
-    message = f"Use elink to find PubMed publications associated with SRA Entrez ID {entrez_id}"
-    result = await elink_agent.ainvoke({"message": message}, config=config)
-
-    # Extract PubMed IDs from response
-    content = result["messages"][-1].content
-    pubmed_ids = re.findall(r"\b\d{7,8}\b", content)
+    ## read the IDs from the elink record (LinkSetDb links), not from LLM prose
+    try:
+        pubmed_ids = await asyncio.to_thread(_elink_pubmed_ids, entrez_id)
+    except ELINK_ERRORS as e:
+        print(
+            f"elink failed for {accession} (Entrez ID {entrez_id}): {e}",
+            file=sys.stderr,
+        )
+        return None
 
-    return list(set(pubmed_ids))  # Remove duplicates
+    # Remove duplicates (keeping order)
+    return list(dict.fromkeys(pubmed_ids))
 
 
 async def _extract_dois_from_pubmed(
@@ -100,6 +236,7 @@ async def _extract_dois_from_pubmed(
     efetch_agent: Callable,
     esummary_agent: Callable,
     config: RunnableConfig,
+    semaphore: asyncio.Semaphore | None = None,
 ) -> dict[str, str | None]:
     """
     Extract DOIs from PubMed Entrez IDs.
@@ -109,47 +246,43 @@ async def _extract_dois_from_pubmed(
         efetch_agent: efetch agent tool
         esummary_agent: esummary agent tool
         config: Runnable config
+        semaphore: Limits concurrent DOI lookups; share one across calls to bound
+            lookups across accessions. Created per call if not provided.
 
     Returns:
         Dictionary mapping {pubmed_id: doi} (doi is None if not found)
     """
-    dois: dict[str, str | None] = {}
 
-    for pubmed_id in pubmed_ids:
-        doi = None
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(ENTREZ_MAX_CONCURRENCY)
 
-        # Primary approach: Use efetch to get full record with DOI
-        try:
-            message = f"Use efetch to retrieve the DOI for PubMed ID {pubmed_id} from the pubmed database in XML format"
-            result = await efetch_agent.ainvoke({"message": message}, config=config)
-            content = result["messages"][-1].content
-
-            # Extract DOI from response - look for DOI pattern
-            doi_match = re.search(r"10\.\d{4,}/[^\s\]]+", content)
-            if doi_match:
-                doi = doi_match.group().rstrip(".,;)")
-        except Exception:
-            pass
-
-        # Fallback: Use esummary
-        if not doi:
+    async def extract_doi(pubmed_id: str) -> str | None:
+        doi = None
+        async with semaphore:
+            # Primary approach: Use efetch to get full record with DOI
             try:
-                message = f"Use esummary to get the DOI for PubMed ID {pubmed_id}"
-                result = await esummary_agent.ainvoke(
-                    {"message": message}, config=config
-                )
-                content = result["messages"][-1].content
-
-                # Extract DOI from response
-                doi_match = re.search(r"10\.\d{4,}/[^\s\]]+", content)
-                if doi_match:
-                    doi = doi_match.group().rstrip(".,;)")
+                message = f"Use efetch to retrieve the DOI for PubMed ID {pubmed_id} from the pubmed database in XML format"
+                result = await efetch_agent.ainvoke({"message": message}, config=config)
+                doi = _search_doi(result["messages"][-1].content)
             except Exception:
                 pass
 
-        dois[pubmed_id] = doi
+            # Fallback: Use esummary
+            if not doi:
+                try:
+                    message = f"Use esummary to get the DOI for PubMed ID {pubmed_id}"
+                    result = await esummary_agent.ainvoke(
+                        {"message": message}, config=config
+                    )
+                    doi = _search_doi(result["messages"][-1].content)
+                except Exception:
+                    pass
+
+        return doi
 
-    return dois
+    # The PubMed IDs are independent, so query them concurrently (bounded by the semaphore)
+    results = await asyncio.gather(*[extract_doi(pmid) for pmid in pubmed_ids])
+    return dict(zip(pubmed_ids, results))
 
 
 async def _download_papers_batch(
@@ -157,70 +290,76 @@ async def _download_papers_batch(
     output_dir: str,
     api_key: str | None = None,
     email: str | None = None,
+    max_concurrency: int = 5,
 ) -> dict[str, dict[str, Any]]:
     """
     Download papers for a batch of DOIs.
+    Each unique DOI is downloaded once; PubMed IDs sharing a DOI get the same result.
 
     Args:
         dois: Dictionary mapping {pubmed_id: doi}
         output_dir: Base directory to save papers
         api_key: CORE API key (optional)
         email: Email for Unpaywall (optional)
+        max_concurrency: Maximum number of concurrent downloads
 
     Returns:
-        Dictionary with download status for each DOI
+        Dictionary with download status for each PubMed ID
     """
-    results: dict[str, dict[str, Any]] = {}
-
     # Create output directory
     Path(output_dir).mkdir(parents=True, exist_ok=True)
 
-    for pubmed_id, doi in dois.items():
-        if not doi:
-            results[pubmed_id] = {
-                "status": "skipped",
-                "doi": None,
-                "path": None,
-                "error": "No DOI found",
-            }
-            continue
+    semaphore = asyncio.Semaphore(max_concurrency)
 
+    async def download(doi: str) -> dict[str, Any]:
         # Sanitize DOI for filename (replace / with _)
         safe_doi = doi.replace("/", "_")
         output_path = os.path.join(output_dir, f"{safe_doi}.pdf")
 
-        # Download the paper
+        # Download the paper (blocking HTTP, so run it off the event loop)
         try:
-            result_msg = download_paper_by_doi(
-                doi=doi,
-                output_path=output_path,
-                api_key=api_key,
-                email=email,
-            )
+            async with semaphore:
+                result_msg = await asyncio.to_thread(
+                    download_paper_by_doi,
+                    doi=doi,
+                    output_path=output_path,
+                    api_key=api_key,
+                    email=email,
+                )
 
             if result_msg.startswith("Successfully"):
-                results[pubmed_id] = {
+                return {
                     "status": "success",
                     "doi": doi,
                     "path": output_path,
                     "error": None,
                 }
-            else:
-                results[pubmed_id] = {
-                    "status": "failed",
-                    "doi": doi,
-                    "path": None,
-                    "error": result_msg,
-                }
+            return {
+                "status": "failed",
+                "doi": doi,
+                "path": None,
+                "error": result_msg,
+            }
         except Exception as e:
-            results[pubmed_id] = {
+            return {
                 "status": "failed",
                 "doi": doi,
                 "path": None,
                 "error": str(e),
             }
 
-    return results
+    # Download each unique DOI once (concurrently), so PubMed IDs sharing a DOI
+    # don't write to the same output path at the same time
+    unique_dois = list(dict.fromkeys(doi for doi in dois.values() if doi))
+    results = await asyncio.gather(*[download(doi) for doi in unique_dois])
+    doi_results = dict(zip(unique_dois, results))
+
+    # Map the results back to the PubMed IDs
+    skipped = {"status": "skipped", "doi": None, "path": None, "error": "No DOI found"}
+    return {
+        pmid: dict(doi_results[doi]) if doi else dict(skipped)
+        for pmid, doi in dois.items()
+    }
 
 
 # ============================================================================
@@ -235,6 +374,13 @@ def create_papers_agent(
     """
     Create an agent that finds DOIs for publications associated with SRA accessions.
 
+    The common case (accession → Entrez ID → PubMed IDs → DOIs) is run as a
+    fixed sequence of steps (esearch sub-agent, a direct elink query, then the
+    efetch/esummary sub-agents), without an LLM planning each step.
+    If elink finds no PubMed links, an empty result is returned.
+    The ReAct agent is only used as a fallback if no Entrez ID is found,
+    the elink query fails, or no accession is provided in the input state.
+
     Args:
         model_name: Override model name from settings
         return_tool: If True, return as tool; if False, return agent
@@ -246,56 +392,105 @@ def create_papers_agent(
     model = set_model(model_name=model_name, agent_name="papers")
 
     # Set tools - sub-agents for querying NCBI
-    tools = [
-        create_esearch_agent(),
-        create_esummary_agent(),
-        create_efetch_agent(),
-        create_elink_agent(),
-    ]
+    esearch_agent = create_esearch_agent()
+    esummary_agent = create_esummary_agent()
+    efetch_agent = create_efetch_agent()
+    elink_agent = create_elink_agent()
+    tools = [esearch_agent, esummary_agent, efetch_agent, elink_agent]
 
-    # State modifier
-    state_mod = "\n".join(
-        [
-            "# Role and Purpose",
-            " - You are an expert bioinformatician helping to find publications associated with SRA accessions",
-            " - Your goal is to find PubMed publications and their DOIs for a given SRA accession",
-            " - You have access to four Entrez sub-agents: esearch, elink, efetch, and esummary",
-            "# Sub-Agent Capabilities",
-            " - esearch_agent: Searches Entrez databases (e.g., sra, gds, pubmed) to find Entrez IDs from accessions or search terms",
-            "   * Use to convert SRA accessions to Entrez IDs",
-            "   * Example: 'Find the Entrez ID for SRX4967527 in the sra database'",
-            " - elink_agent: Links related entries between Entrez databases using Entrez IDs",
-            "   * Use to find PubMed publications linked to SRA Entrez IDs",
-            "   * Example: 'Use elink with dbfrom=sra, db=pubmed, and id=<entrez_id>'",
-            "   * Returns Entrez IDs (not accessions); requires Entrez IDs as input",
-            " - efetch_agent: Fetches full records from Entrez databases",
-            "   * Best for extracting DOIs from PubMed records (use rettype=xml for detailed records)",
-            "   * Example: 'Use efetch to retrieve the DOI for PubMed ID <pmid> from the pubmed database in XML format'",
-            "   * If unsure of database, can use which_entrez_databases tool",
-            " - esummary_agent: Fetches summaries from Entrez databases",
-            "   * Use as fallback if efetch doesn't return DOI",
-            "   * Example: 'Use esummary to get the DOI for PubMed ID <pmid>'",
-            "   * If unsure of database, can use which_entrez_databases tool",
-            "# Workflow",
-            " 1. Convert the SRA accession to an Entrez ID using esearch_agent (database=sra)",
-            " 2. Find associated PubMed Entrez IDs using elink_agent (dbfrom=sra, db=pubmed, id=<sra_entrez_id>)",
-            " 3. For each PubMed Entrez ID:",
-            "    a. Try efetch_agent first (database=pubmed, rettype=xml) to extract DOI from full record",
-            "    b. If DOI not found, try esummary_agent as fallback",
-            " 4. Return structured result with accession and list of publications (PubMed ID + DOI)",
-            "# Strategy",
-            " - If esearch doesn't find the accession, return empty publications list",
-            " - If elink returns no PubMed links, return empty publications list",
-            " - Not all PubMed records have DOIs - set doi=None for those without DOIs",
-            " - Be thorough: always try efetch (XML format) first, then esummary as fallback for DOI extraction",
-        ]
-    )
+    # one DOI lookup limiter for all accessions run through this agent
+    doi_semaphore = asyncio.Semaphore(ENTREZ_MAX_CONCURRENCY)
 
     # Create agent with response_format for structured output
-    agent = create_react_agent(
-        model=model, tools=tools, prompt=state_mod, response_format=PublicationsResult
+    react_agent = create_react_agent(
+        model=model, tools=tools, prompt=STATE_MOD, response_format=PublicationsResult
     )
 
+    # graph nodes
+    async def find_publications_node(
+        state: PapersState, config: RunnableConfig
+    ) -> dict[str, Any]:
+        accession = state.get("accession")
+        if not accession:
+            return {"pubmed_ids": None}
+        pubmed_ids = await _find_publications_for_accession(
+            accession, esearch_agent, config
+        )
+        return {"pubmed_ids": pubmed_ids}
+
+    def route_publications(state: PapersState) -> str:
+        # None = the fixed sequence failed; [] = no linked publications (empty result)
+        return "papers_agent" if state.get("pubmed_ids") is None else "extract_dois"
+
+    async def extract_dois_node(
+        state: PapersState, config: RunnableConfig
+    ) -> dict[str, Any]:
+        dois = await _extract_dois_from_pubmed(
+            state["pubmed_ids"],
+            efetch_agent,
+            esummary_agent,
+            config,
+            semaphore=doi_semaphore,
+        )
+        publications = [
+            PublicationDOI(pubmed_id=pmid, doi=doi) for pmid, doi in dois.items()
+        ]
+        return {
+            "structured_response": PublicationsResult(
+                accession=state["accession"], publications=publications
+            ),
+            "messages": [
+                AIMessage(
+                    content=f"Found {len(publications)} publication(s) for {state['accession']}",
+                    name="papers_agent",
+                )
+            ],
+        }
+
+    async def papers_agent_node(
+        state: PapersState, config: RunnableConfig
+    ) -> dict[str, Any]:
+        try:
+            result = await asyncio.wait_for(
+                react_agent.ainvoke({"messages": state["messages"]}, config=config),
+                timeout=REACT_AGENT_TIMEOUT,
+            )
+        except (asyncio.TimeoutError, GraphRecursionError) as e:
+            # give up on this accession rather than failing the whole batch
+            reason = (
+                f"timed out after {REACT_AGENT_TIMEOUT}s"
+                if isinstance(e, asyncio.TimeoutError)
+                else "hit the recursion limit"
+            )
+            # record the failure, so it isn't reported as "no publications"
+            return {
+                "structured_response": None,
+                "error": f"Papers agent {reason}",
+                "messages": [
+                    AIMessage(
+                        content=f"Papers agent {reason}",
+                        name="papers_agent",
+                    )
+                ],
+            }
+        return {
+            "structured_response": result.get("structured_response"),
+            "messages": [result["messages"][-1]],
+        }
+
+    # build graph
+    workflow = StateGraph(PapersState)
+    workflow.add_node("find_publications", find_publications_node)
+    workflow.add_node("extract_dois", extract_dois_node)
+    workflow.add_node("papers_agent", papers_agent_node)
+    workflow.add_edge(START, "find_publications")
+    workflow.add_conditional_edges(
+        "find_publications", route_publications, ["extract_dois", "papers_agent"]
+    )
+    workflow.add_edge("extract_dois", END)
+    workflow.add_edge("papers_agent", END)
+    agent = workflow.compile()
+
     # Return agent if not wrapping as tool
     if not return_tool:
         return agent
@@ -312,32 +507,12 @@ def create_papers_agent(
         """
         message = f"Find all publications and their DOIs for SRA accession {accession}"
         result = await agent.ainvoke(
-            {"messages": [HumanMessage(content=message)]}, config=config
+            {"messages": [HumanMessage(content=message)], "accession": accession},
+            config=config,
         )
 
-        # The structured response is in the 'structured_response' key
-        if "structured_response" in result:
-            pubs_result = result["structured_response"]
-            if isinstance(pubs_result, PublicationsResult):
-                # Extract DOIs (skip None values)
-                return [
-                    pub.doi for pub in pubs_result.publications if pub.doi is not None
-                ]
-            elif isinstance(pubs_result, dict):
-                # Handle dict format
-                publications = pubs_result.get("publications", [])
-                dois = []
-                for pub in publications:
-                    if isinstance(pub, dict):
-                        doi = pub.get("doi")
-                        if doi:
-                            dois.append(doi)
-                    elif hasattr(pub, "doi") and pub.doi:
-                        dois.append(pub.doi)
-                return dois
-
-        # Fallback: return empty list
-        return []
+        # Extract DOIs (skip None values)
+        return [doi for _, doi in _parse_publications(result) if doi]
 
     return invoke_papers_agent
 
@@ -353,6 +528,8 @@ async def process_accession(
     api_key: str | None = None,
     email: str | None = None,
     config: dict[str, Any] | None = None,
+    papers_agent: Any | None = None,
+    max_concurrency: int = 5,
 ) -> dict[str, Any]:
     """
     Process a single SRA accession: find publications, extract DOIs, and download papers.
@@ -363,6 +540,9 @@ async def process_accession(
         api_key: CORE API key (optional)
         email: Email for Unpaywall (optional)
         config: LangChain config
+        papers_agent: Papers agent from create_papers_agent(return_tool=False);
+            created if not provided. Pass one in to reuse it across accessions.
+        max_concurrency: Maximum number of concurrent paper downloads
 
     Returns:
         Dictionary with processing results
@@ -371,34 +551,33 @@ async def process_accession(
         config = {}
 
     # Step 1: Use papers agent to find DOIs
-    papers_agent = create_papers_agent(return_tool=False)
+    if papers_agent is None:
+        papers_agent = create_papers_agent(return_tool=False)
     message = f"Find all publications and their DOIs for SRA accession {accession}"
     result = await papers_agent.ainvoke(
-        {"messages": [HumanMessage(content=message)]}, config=config
+        {"messages": [HumanMessage(content=message)], "accession": accession},
+        config=config,
     )
 
+    # The agent failed (e.g., timed out); report it, so the accession can be rerun
+    error = result.get("error")
+    if error:
+        return {
+            "accession": accession,
+            "pubmed_ids": [],
+            "dois": {},
+            "downloads": {},
+            "summary": f"Error: {error}",
+            "error": error,
+        }
+
     # Extract publications from structured response
     pubmed_ids = []
     dois = {}
-    if "structured_response" in result:
-        pubs_result = result["structured_response"]
-        if isinstance(pubs_result, PublicationsResult):
-            # Extract PubMed IDs and DOIs
-            pubmed_ids = [pub.pubmed_id for pub in pubs_result.publications]
-            dois = {pub.pubmed_id: pub.doi for pub in pubs_result.publications}
-        elif isinstance(pubs_result, dict):
-            # Handle dict format
-            publications = pubs_result.get("publications", [])
-            for pub in publications:
-                if isinstance(pub, dict):
-                    pmid = pub.get("pubmed_id")
-                    doi = pub.get("doi")
-                    if pmid:
-                        pubmed_ids.append(pmid)
-                        dois[pmid] = doi
-                elif hasattr(pub, "pubmed_id"):
-                    pubmed_ids.append(pub.pubmed_id)
-                    dois[pub.pubmed_id] = pub.doi
+    for pmid, doi in _parse_publications(result):
+        if pmid:
+            pubmed_ids.append(pmid)
+            dois[pmid] = doi
 
     if not pubmed_ids:
         return {
@@ -407,6 +586,7 @@ async def process_accession(
             "dois": {},
             "downloads": {},
             "summary": "No publications found",
+            "error": None,
         }
 
     # Filter out None DOIs for downloading
@@ -419,11 +599,14 @@ async def process_accession(
             "dois": dois,
             "downloads": {},
             "summary": f"Found {len(pubmed_ids)} publication(s) but no DOIs available",
+            "error": None,
         }
 
     # Step 2: Download papers
     output_dir = os.path.join(output_base_dir, accession)
-    downloads = await _download_papers_batch(valid_dois, output_dir, api_key, email)
+    downloads = await _download_papers_batch(
+        valid_dois, output_dir, api_key, email, max_concurrency=max_concurrency
+    )
 
     # Create summary
     num_success = sum(1 for d in downloads.values() if d["status"] == "success")
@@ -436,6 +619,7 @@ async def process_accession(
         "dois": dois,
         "downloads": downloads,
         "summary": summary,
+        "error": None,
     }
 
 
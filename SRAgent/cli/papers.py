@@ -15,7 +15,7 @@ from rich.table import Table
 
 ## package
 from SRAgent.cli.utils import CustomFormatter
-from SRAgent.agents.papers import process_accession
+from SRAgent.agents.papers import create_papers_agent, process_accession
 from SRAgent.tools.utils import set_entrez_access
 from SRAgent.workflows.graph_utils import handle_write_graph_option
 
@@ -90,7 +90,7 @@ def papers_parser(subparsers) -> None:
         "--max-concurrency",
         type=int,
         default=5,
-        help="Maximum number of concurrent accession processing tasks (default: 5)",
+        help="Maximum number of concurrent accession processing tasks, and of concurrent paper downloads per accession (default: 5)",
     )
     sub_parser.add_argument(
         "--recursion-limit",
@@ -182,6 +182,9 @@ async def _process_accessions_batch(
     """
     semaphore = asyncio.Semaphore(max_concurrency)
 
+    # create the agent once and share it across all accessions
+    papers_agent = create_papers_agent(return_tool=False)
+
     async def process_with_semaphore(accession: str) -> dict[str, Any]:
         async with semaphore:
             config = {"recursion_limit": recursion_limit}
@@ -191,6 +194,8 @@ async def _process_accessions_batch(
                 api_key=core_api_key,
                 email=email,
                 config=config,
+                papers_agent=papers_agent,
+                max_concurrency=max_concurrency,
             )
 
     # Process all accessions concurrently (with limit)
@@ -229,6 +234,7 @@ def _write_results_csv(
         accession = result["accession"]
         dois = result.get("dois", {})
         downloads = result.get("downloads", {})
+        error = result.get("error")
 
         if not dois:
             rows.append(
@@ -237,6 +243,7 @@ def _write_results_csv(
                     "pubmed_id": None,
                     "doi": None,
                     "download_path": None,
+                    "error": error,
                 }
             )
             continue
@@ -249,6 +256,7 @@ def _write_results_csv(
                     "pubmed_id": pubmed_id,
                     "doi": doi,
                     "download_path": download_info.get("path"),
+                    "error": error,
                 }
             )
 
@@ -256,7 +264,7 @@ def _write_results_csv(
         pd.DataFrame(rows)
         if rows
         else pd.DataFrame(
-            columns=[accession_column, "pubmed_id", "doi", "download_path"]
+            columns=[accession_column, "pubmed_id", "doi", "download_path", "error"]
         )
     )
 
@@ -294,6 +302,7 @@ def _display_results_table(results: list[dict[str, Any]]) -> None:
     table.add_column("DOIs", justify="right", style="yellow")
     table.add_column("Downloaded", justify="right", style="green")
     table.add_column("Failed", justify="right", style="red")
+    table.add_column("Status")
 
     for result in results:
         num_pubs = len(result["pubmed_ids"])
@@ -313,6 +322,7 @@ def _display_results_table(results: list[dict[str, Any]]) -> None:
             str(num_dois),
             str(num_downloaded),
             str(num_failed),
+            "[red]error[/red]" if result.get("error") else "[green]ok[/green]",
         )
 
     console.print(table)
@@ -349,8 +359,6 @@ def papers_main(args: argparse.Namespace) -> None:
 
     # Handle write-graph option
     if args.write_graph:
-        from SRAgent.agents.papers import create_papers_agent
-
         handle_write_graph_option(create_papers_agent, args.write_graph)
         return
 
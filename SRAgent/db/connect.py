@@ -2,6 +2,7 @@
 ## batteries
 import os
 import warnings
+from functools import lru_cache
 from importlib import resources
 from tempfile import NamedTemporaryFile
 
@@ -20,6 +21,21 @@ def db_connect() -> connection:
     # get settings
     if not os.getenv("DYNACONF"):
         os.environ["DYNACONF"] = "prod"
+    # connect to db
+    return psycopg2.connect(**get_db_params(os.environ["DYNACONF"]))
+
+
+@lru_cache(maxsize=None)
+def get_db_params(environment: str) -> dict:
+    """
+    Get the database connection parameters.
+    Cached per environment, so settings, secrets, and certificates
+    are only fetched once per process instead of on every connection.
+    Args:
+        environment: The Dynaconf environment (e.g., "prod" or "test"); used as the cache key
+    Returns:
+        A dictionary of psycopg2 connection parameters
+    """
     package_path = os.path.dirname(os.path.abspath(__file__))
     s_path1 = os.path.join(os.path.dirname(package_path), "settings.yml")
     s_path2 = str(resources.files("SRAgent").joinpath("settings.yml"))
@@ -32,8 +48,7 @@ def db_connect() -> connection:
 
     # get db certs
     certs = get_db_certs()
-    # connect to db
-    db_params = {
+    return {
         "host": settings.db_host,
         "database": settings.db_name,
         "user": settings.db_user,
@@ -45,7 +60,6 @@ def db_connect() -> connection:
         "sslkey": certs["client-key.pem"],
         "connect_timeout": settings.db_timeout,
     }
-    return psycopg2.connect(**db_params)
 
 
 def get_db_certs(certs=["server-ca.pem", "client-cert.pem", "client-key.pem"]) -> dict:
@@ -10,6 +10,9 @@ from psycopg2.extensions import connection
 ## package
 from SRAgent.db.utils import get_unique_columns
 
+# records per INSERT statement (execute_values defaults to 100)
+UPSERT_PAGE_SIZE = 1000
+
 
 # functions
 def db_upsert(df: pd.DataFrame, table_name: str, conn: connection) -> None:
@@ -48,6 +51,61 @@ def db_upsert(df: pd.DataFrame, table_name: str, conn: connection) -> None:
     # Convert DataFrame to list of tuples
     values = [tuple(x) for x in df.to_numpy()]
 
+    # upsert the values
+    _upsert_values(values, columns, unique_columns, table_name, conn)
+
+
+def db_upsert_rows(
+    rows: List[Dict[str, Any]], table_name: str, conn: connection
+) -> None:
+    """
+    Upsert a list of records (dicts) into PostgreSQL, without building a DataFrame.
+    If records exist (based on unique constraints), update them; otherwise insert new records.
+    Args:
+        rows: list of records; all records must have the same keys
+        table_name: name of the target table
+        conn: psycopg2 connection object
+    """
+    # if no rows, return
+    if not rows:
+        return
+
+    # Get columns, excluding the 'id' column from the upsert
+    columns = [col for col in rows[0].keys() if col != "id"]
+
+    # Create ON CONFLICT clause based on unique constraints
+    unique_columns = get_unique_columns(table_name, conn)
+
+    # Convert records to tuples, dropping duplicates based on unique columns
+    values = []
+    seen = set()
+    for row in rows:
+        key = tuple(row.get(col) for col in unique_columns)
+        if key in seen:
+            continue
+        seen.add(key)
+        values.append(tuple(row[col] for col in columns))
+
+    # upsert the values
+    _upsert_values(values, columns, unique_columns, table_name, conn)
+
+
+def _upsert_values(
+    values: List[Tuple],
+    columns: List[str],
+    unique_columns: List[str],
+    table_name: str,
+    conn: connection,
+) -> None:
+    """
+    Run the INSERT ... ON CONFLICT statement for a set of value tuples.
+    Args:
+        values: list of value tuples, ordered as in columns
+        columns: column names
+        unique_columns: unique constraint columns for the table
+        table_name: name of the target table
+        conn: psycopg2 connection object
+    """
     # Create the INSERT statement with ON CONFLICT clause
     insert_stmt = f"INSERT INTO {table_name} ({', '.join(columns)})"
     insert_stmt += f"\nVALUES %s"
@@ -65,7 +123,7 @@ def db_upsert(df: pd.DataFrame, table_name: str, conn: connection) -> None:
     # Execute the query
     try:
         with conn.cursor() as cur:
-            execute_values(cur, insert_stmt, values)
+            execute_values(cur, insert_stmt, values, page_size=UPSERT_PAGE_SIZE)
             conn.commit()
     except Exception as e:
         conn.rollback()
@@ -87,20 +87,21 @@ def query_vector_db(
     vector_store = load_vector_store(chroma_dir_path, collection_name="mondo")
 
     # Query the vector store
-    message = ""
+    lines = []
     try:
         results = vector_store.similarity_search(query, k=k)
-        message += f'# Results for query: "{query}"\n'
+        lines.append(f'# Results for query: "{query}"\n')
         for i, res in enumerate(results, 1):
             id = res.metadata.get("id", "No ID available")
             if not id:
                 continue
-            message += f"{i}. {id}\n"
+            lines.append(f"{i}. {id}\n")
             name = res.metadata.get("name", "No name available")
-            message += f"  Ontology name: {name}\n"
-            message += f"  Description: {res.page_content}\n"
+            lines.append(f"  Ontology name: {name}\n")
+            lines.append(f"  Description: {res.page_content}\n")
     except Exception as e:
         return f"Error performing search: {e}"
+    message = "".join(lines)
     if not message:
         message = (
             f'No results found for query: "{query}". Consider refining your query.'
@@ -167,9 +168,9 @@ def get_neighbors(
 
     # get neighbors
     target_prefix = ["MONDO:", "PATO:"]
-    message = ""
+    lines = []
     try:
-        message += f'# Neighbors in the ontology for: "{mondo_id}"\n'
+        lines.append(f'# Neighbors in the ontology for: "{mondo_id}"\n')
         for i, node_id in enumerate(all_neighbors(g, mondo_id), 1):
             # filter out non-MONDO nodes
             if (
@@ -180,15 +181,16 @@ def get_neighbors(
             # extract node name and description
             node_name = g.nodes[node_id]["name"]
             node_def = g.nodes[node_id].get("def")
-            message += f"{i}. {node_id}\n"
-            message += f"  Ontology name: {node_name}\n"
-            message += f"  Description: {node_def}\n"
+            lines.append(f"{i}. {node_id}\n")
+            lines.append(f"  Ontology name: {node_name}\n")
+            lines.append(f"  Description: {node_def}\n")
             # limit to 50 neighbors
             if i >= 50:
                 break
     except Exception as e:
         return f"Error getting neighbors: {e}"
 
+    message = "".join(lines)
     if not message:
         message = f'No neighbors found for ID: "{mondo_id}".'
     return message
@@ -233,7 +235,7 @@ def query_mondo_ols(
     if not results:
         return f"No results found for search term: '{search_term}'."
 
-    message = f"# Results from OLS for '{search_term}':\n"
+    lines = [f"# Results from OLS for '{search_term}':\n"]
     for i, doc in enumerate(results, 1):
         # Each doc should have an 'obo_id', a 'label', and possibly a 'description'
         obo_id = doc.get("obo_id", "No ID")
@@ -251,15 +253,15 @@ def query_mondo_ols(
         # MONDO often has synonyms which can be useful
         synonyms = doc.get("synonym", [])
 
-        message += f"{i}. {obo_id} - {label}\n   Description: {description}\n"
+        lines.append(f"{i}. {obo_id} - {label}\n   Description: {description}\n")
         if synonyms:
-            message += (
+            lines.append(
                 f"   Synonyms: {', '.join(synonyms[:5])}"  # Show first 5 synonyms
             )
             if len(synonyms) > 5:
-                message += f" (and {len(synonyms) - 5} more)"
-            message += "\n"
-    return message
+                lines.append(f" (and {len(synonyms) - 5} more)")
+            lines.append("\n")
+    return "".join(lines)
 
 
 if __name__ == "__main__":
@@ -13,6 +13,9 @@ from langchain_core.tools import tool
 ## package
 from SRAgent.tools.utils import batch_ids, truncate_values, xml2json, set_entrez_access
 
+# null PAIRED/SINGLE values in the JSON-converted records
+PAIRED_SINGLE_NULL_REGEX = re.compile(r'"(PAIRED|SINGLE)": +null')
+
 
 @tool
 def efetch(
@@ -26,7 +29,6 @@ def efetch(
     set_entrez_access()
     batch_size = 200  # Maximum number of IDs per request as per NCBI guidelines
     records = []
-    regex = re.compile(r'"(PAIRED|SINGLE)": +null')
 
     for id_batch in batch_ids(entrez_ids, batch_size):
         time.sleep(0.34)  # Respect the rate limit of 3 requests per second
@@ -59,7 +61,7 @@ def efetch(
         batch_record = xml2json(batch_record)
 
         # fix values for PAIRED and SINGLE
-        batch_record = re.sub(regex, '\\1: "yes"', batch_record)
+        batch_record = PAIRED_SINGLE_NULL_REGEX.sub('\\1: "yes"', batch_record)
 
         # Check for errors in the response
         if "Error occurred: cannot get document summary" in batch_record:
@@ -2,6 +2,7 @@
 ## batteries
 import os
 import time
+from functools import lru_cache
 from typing import Annotated, List
 
 ## 3rd party
@@ -29,9 +30,11 @@ def elink_error_check(batch_record):
     return None
 
 
+@lru_cache(maxsize=1)
 def get_entrez_databases() -> List[str]:
     """
     Get a list of possible Entrez databases.
+    Uses lru_cache so that Entrez einfo is only queried once per process.
     Returns:
         List[str]: List of possible Entrez databases.
     """
@@ -7,6 +7,10 @@ from typing import Annotated
 
 from langchain_core.tools import tool
 
+# regex patterns for cleaning fetched pages
+URL_QUERY_PREFIX_REGEX = re.compile(r".+=")
+MULTI_NEWLINE_REGEX = re.compile(r"\n\n+")
+
 
 # functions
 def _fetch_ncbi_record(
@@ -45,7 +49,7 @@ def _fetch_ncbi_record(
                 if href.get("href").startswith("/geo/query/"):
                     # extract the url and GEO accession
                     url = href.get("href")
-                    GEO_accession = str(re.sub(r".+=", "", url))
+                    GEO_accession = str(URL_QUERY_PREFIX_REGEX.sub("", url))
                     url = f"https://www.ncbi.nlm.nih.gov{url}"
                     # fetch the page
                     response = requests.get(url)
@@ -62,7 +66,7 @@ def _fetch_ncbi_record(
         section = section.find_parent("div")
     if section is None:
         return f"Error: Unable to locate details for accession {term}."
-    return re.sub(r"\n\n+", "\n\n", section.text.strip()) + "\n\n".join(gds_data)
+    return MULTI_NEWLINE_REGEX.sub("\n\n", section.text.strip()) + "\n\n".join(gds_data)
 
 
 @tool
@@ -138,6 +138,31 @@ def create_router_node() -> Callable:
     Router for the graph
     """
     model = set_model(agent_name="convert_router")
+    structured_model = model.with_structured_output(Choice, strict=True)
+
+    # build the prompt template once; only the history varies per call.
+    # the model is only called when no accessions have been extracted (see invoke_router)
+    prompt_template = ChatPromptTemplate.from_messages(
+        [
+            # First add any static system message if needed
+            (
+                "system",
+                "\n".join(
+                    [
+                        "# Instructions",
+                        " - You determine whether Sequence Read Archive SRX accessions (e.g., SRX123456) have been obtained from the Entrez ID.",
+                        " - There should be at least one SRX accession.",
+                        " - ERX accessions are also valid.",
+                        ' - If one or more accessions have been obtained, state "STOP". If more information is needed, state "CONTINUE".',
+                        ' - If more information is needed ("CONTINUE"), provide one or two sentences of feedback on how to obtain the data (e.g., use esearch instead of efetch).',
+                    ]
+                ),
+            ),
+            ("human", "\nHere are the last few messages:"),
+            MessagesPlaceholder(variable_name="history"),
+            ("human", "\nHere are the extracted SRA accessions:\n - SRX: No accessions found\n\n"),
+        ]
+    )
 
     async def invoke_router(
         state: GraphState,
@@ -145,42 +170,22 @@ def create_router_node() -> Callable:
         """
         Route the conversation to the appropriate tool based on the current state of the conversation.
         """
-
-        # format accessions
-        def format_accessions(accessions):
-            if not accessions:
-                return "No accessions found"
-            return ", ".join(accessions)
-
-        accesions = "\n".join([" - SRX: " + format_accessions(state["SRX"]), "\n"])
+        # accessions already obtained, so no need to call the model
+        if state.get("SRX"):
+            return {
+                "route": Choices.STOP.value,
+                "messages": [
+                    AIMessage(content="SRX accessions obtained; skipping the router model.")
+                ],
+                "attempts": 1,
+            }
 
         # create prompt
-        prompt = ChatPromptTemplate.from_messages(
-            [
-                # First add any static system message if needed
-                (
-                    "system",
-                    "\n".join(
-                        [
-                            "# Instructions",
-                            " - You determine whether Sequence Read Archive SRX accessions (e.g., SRX123456) have been obtained from the Entrez ID.",
-                            " - There should be at least one SRX accession.",
-                            " - ERX accessions are also valid.",
-                            ' - If one or more accessions have been obtained, state "STOP". If more information is needed, state "CONTINUE".',
-                            ' - If more information is needed ("CONTINUE"), provide one or two sentences of feedback on how to obtain the data (e.g., use esearch instead of efetch).',
-                        ]
-                    ),
-                ),
-                ("human", "\nHere are the last few messages:"),
-                MessagesPlaceholder(variable_name="history"),
-                ("human", "\nHere are the extracted SRA accessions:\n" + accesions),
-            ]
+        formatted_prompt = prompt_template.format_messages(
+            history=state["messages"][-4:]
         )
-        formatted_prompt = prompt.format_messages(history=state["messages"][-4:])
         # call the model
-        response = await model.with_structured_output(Choice, strict=True).ainvoke(
-            formatted_prompt
-        )
+        response = await structured_model.ainvoke(formatted_prompt)
         # format the response
         return {
             "route": response.Choice.value,
@@ -197,7 +202,7 @@ def route_interpret(state: GraphState) -> str:
     """
     if state["attempts"] >= 2:
         return END
-    return "convert_agent_node" if state["route"] == "CONTINUE" else END
+    return "convert_agent_node" if state["route"] == Choices.CONTINUE.value else END
 
 
 def create_convert_graph() -> StateGraph:
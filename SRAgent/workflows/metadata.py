@@ -4,6 +4,7 @@ import re
 import sys
 import asyncio
 import operator
+from contextlib import closing
 from enum import Enum
 from typing import (
     Annotated,
@@ -17,8 +18,7 @@ from typing import (
     get_args,
     get_origin,
 )
-import pandas as pd
-from langchain_core.messages import BaseMessage, HumanMessage
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
 from pydantic import BaseModel, Field
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langgraph.graph import START, END, StateGraph
@@ -27,11 +27,14 @@ from langchain_core.runnables.config import RunnableConfig
 ## package
 from SRAgent.agents.utils import set_model
 from SRAgent.db.connect import db_connect
-from SRAgent.db.upsert import db_upsert
+from SRAgent.db.upsert import db_upsert_rows
 from SRAgent.agents.sragent import create_sragent_agent
 from SRAgent.workflows.tissue_ontology import create_tissue_ontology_workflow
 from SRAgent.organisms import OrganismEnum
 
+# regex for SRR/ERR accessions in agent responses
+SRR_REGEX = re.compile(r"(?:SRR|ERR)\d{4,}")
+
 
 # classes
 class YesNo(Enum):
@@ -147,6 +150,20 @@ class GraphState(TypedDict):
     ]
 
 
+# graph state field => field annotation
+GRAPH_STATE_ANNOT = {
+    key: get_args(value)[1]
+    for key, value in GraphState.__annotations__.items()
+    if get_origin(value) is Annotated
+}
+
+# metadata level => metadata model
+METADATA_LEVELS = {
+    "all": AllMetadataEnum,
+    "tertiary": TertiaryMetadataEnum,
+}
+
+
 # functions
 def get_metadata_items(metadata_level: str = "all") -> Dict[str, str]:
     """
@@ -155,45 +172,51 @@ def get_metadata_items(metadata_level: str = "all") -> Dict[str, str]:
         A dictionary of metadata items
     """
     # which metadata items to include?
-    if metadata_level == "all":
-        to_include = AllMetadataEnum.model_fields.keys()
-    elif metadata_level == "tertiary":
-        to_include = TertiaryMetadataEnum.model_fields.keys()
-    else:
+    selected_enum = METADATA_LEVELS.get(metadata_level)
+    if selected_enum is None:
         raise ValueError("The metadata_level must be 'all' or 'tertiary'.")
+    to_include = selected_enum.model_fields.keys()
 
     # get the metadata items
-    metadata_items = {}
-    for key, value in GraphState.__annotations__.items():
-        if key not in to_include or not get_origin(value) is Annotated:
-            continue
-        metadata_items[key] = get_args(value)[1]
-    return metadata_items
+    return {
+        key: annot for key, annot in GRAPH_STATE_ANNOT.items() if key in to_include
+    }
 
 
 def create_sragent_agent_node():
     # create the agent
-    agent = create_sragent_agent()
+    agent = create_sragent_agent(return_tool=False)
+
+    # create the static part of the prompt once; only the SRX accession varies per call
+    prompt_body = "\n".join(
+        [f" - {x}" for x in get_metadata_items("all").values()]
+        + [
+            "# IMPORTANT NOTES",
+            " - If the dataset is not single cell, then some of the other metadata fields may not be applicable.",
+        ]
+    )
 
     # create the node function
     async def invoke_sragent_agent_node(state: GraphState) -> Dict[str, Any]:
         """Invoke the SRAgent to get the initial messages"""
 
         # create message prompt
-        metadata_items = get_metadata_items("all").values()
         prompt = "\n".join(
             [
                 "# Instructions",
                 f"For the SRA experiment accession {state['SRX']}, find the following dataset metadata:",
-                "\n".join([f" - {x}" for x in metadata_items]),
-                "# IMPORTANT NOTES",
-                " - If the dataset is not single cell, then some of the other metadata fields may not be applicable.",
+                prompt_body,
             ]
         )
-        # call the agent
-        response = await agent.ainvoke({"messages": [HumanMessage(content=prompt)]})
-        # return the last message in the response
-        return {"messages": [response["messages"][-1]]}
+        # invoke the agent
+        agent_input = {"messages": [HumanMessage(content=prompt)]}
+        result = await agent.ainvoke(agent_input)
+        # return the final message
+        return {
+            "messages": [
+                AIMessage(content=result["messages"][-1].content, name="sragent_agent")
+            ]
+        }
 
     return invoke_sragent_agent_node
 
@@ -209,9 +232,9 @@ def max_str_len(x: str, max_len: int = 300) -> str:
     """
     if isinstance(x, list):
         x = ",".join(x)
-    if not isinstance(x, str):
+    if not isinstance(x, str) or len(x) <= max_len:
         return x
-    return x if len(x) <= max_len else x[: max_len - 3] + "..."
+    return x[: max_len - 3] + "..."
 
 
 def get_extracted_fields(response) -> Dict[str, str]:
@@ -242,54 +265,52 @@ def get_extracted_fields(response) -> Dict[str, str]:
 
 def get_annot(key: str, state: dict) -> str:
     """If the key matches a graph state field, return the field annotation"""
-    try:
-        return get_args(GraphState.__annotations__[key])[1]
-    except KeyError:
-        return key
+    return GRAPH_STATE_ANNOT.get(key, key)
 
 
 def create_get_metadata_node() -> Callable:
     """Create a node to extract metadata"""
     model = set_model(agent_name="metadata")
+    structured_model = model.with_structured_output(AllMetadataEnum, strict=True)
+
+    # build the prompt template once; only the message history varies per call
+    metadata_items = "\n".join(
+        [f" - {x}" for x in get_metadata_items("all").values()]
+    )
+    system_prompt = "\n".join(
+        [
+            "# Instructions",
+            " - Your job is to extract metadata from the provided text on a Sequence Read Archive (SRA) experiment.",
+            " - The provided text is from 1 or more attempts to find the metadata, so you many need to combine information from multiple sources.",
+            ' - If there are multiple sources, use majority rules to determine the metadata values, but weigh ambiguous values less (e.g., "unknown", "likely", or "assumed").',
+            ' - If there is not enough information to determine the metadata, respond with "unsure" or "other", depending on the metadata field.',
+            ' - If the selected "lib_prep" field is NOT "10X_Genomics", the "tech_10x" field should be "not_applicable".',
+            ' - "single cell" typically refers to whole-cell sequencing; "nucleus" is usually stated if single nucleus sequencing.',
+            " - Keep free text responses short; use less than 300 characters.",
+            "# The specific metadata to extract",
+            metadata_items,
+        ]
+    )
+    prompt_template = ChatPromptTemplate.from_messages(
+        [
+            ("system", system_prompt),
+            ("human", "\nHere are the last few messages:"),
+            MessagesPlaceholder(variable_name="history"),
+        ]
+    )
 
     async def invoke_get_metadata_node(
         state: GraphState, config: RunnableConfig
     ) -> Dict[str, Any]:
         """Structured data extraction"""
-        metadata_items = "\n".join(
-            [f" - {x}" for x in get_metadata_items("all").values()]
-        )
         # format prompt
-        prompt = "\n".join(
-            [
-                "# Instructions",
-                " - Your job is to extract metadata from the provided text on a Sequence Read Archive (SRA) experiment.",
-                " - The provided text is from 1 or more attempts to find the metadata, so you many need to combine information from multiple sources.",
-                ' - If there are multiple sources, use majority rules to determine the metadata values, but weigh ambiguous values less (e.g., "unknown", "likely", or "assumed").',
-                ' - If there is not enough information to determine the metadata, respond with "unsure" or "other", depending on the metadata field.',
-                ' - If the selected "lib_prep" field is NOT "10X_Genomics", the "tech_10x" field should be "not_applicable".',
-                ' - "single cell" typically refers to whole-cell sequencing; "nucleus" is usually stated if single nucleus sequencing.',
-                " - Keep free text responses short; use less than 300 characters.",
-                "# The specific metadata to extract",
-                metadata_items,
-            ]
-        )
-        prompt = ChatPromptTemplate.from_messages(
-            [
-                ("system", prompt),
-                ("human", "\nHere are the last few messages:"),
-                MessagesPlaceholder(variable_name="history"),
-            ]
-        )
-        prompt = prompt.format_messages(history=state["messages"])
+        prompt = prompt_template.format_messages(history=state["messages"])
         # try to extract the metadata
         max_retries = 3
         for attempt in range(max_retries):
             try:
                 # call the model
-                response = await model.with_structured_output(
-                    AllMetadataEnum, strict=True
-                ).ainvoke(prompt)
+                response = await structured_model.ainvoke(prompt)
                 extracted_fields = get_extracted_fields(response)
                 break
             except Exception as e:
@@ -352,9 +373,11 @@ def create_get_metadata_node() -> Callable:
 
 def fmt(x: Union[str, List[str]]) -> str:
     """If a list, join them with a comma into one string"""
-    if type(x) != list:
+    if isinstance(x, str) or not isinstance(x, list):
         return x
-    return ",".join([str(y) for y in x])
+    if not x:
+        return ""
+    return ",".join(map(str, x))
 
 
 def create_tissue_ontology_node() -> Callable:
@@ -393,49 +416,55 @@ def create_tissue_ontology_node() -> Callable:
     return invoke_tissue_ontology_node
 
 
-async def invoke_SRX2SRR_sragent_agent_node(
-    state: GraphState, attempts: int = 2
-) -> Dict[str, Any]:
-    """Invoke the SRAgent to get the SRR accessions for the SRX accession"""
-    # format the message
-    suffix = "Generally, the bigquery agent can handle this task."
-    if state["SRX"].startswith("SRX"):
-        message = f"Find the SRR accessions for {state['SRX']}. Provide a list of SRR accessions. {suffix}"
-    elif state["SRX"].startswith("ERX"):
-        message = f"Find the ERR accessions for {state['SRX']}. Provide a list of ERR accessions. {suffix}"
-    else:
-        message = f'The wrong accession was provided: "{state["SRX"]}". The accession must start with "SRR" or "ERR".'
-    # call the agent
+def create_SRX2SRR_sragent_agent_node() -> Callable:
+    """Create a node to get the SRR accessions for the SRX accession"""
+    # create the agent
     agent = create_sragent_agent()
 
-    # run the agent
-    for i in range(attempts):
-        response = await agent.ainvoke({"messages": [HumanMessage(content=message)]})
-        # extract all SRR/ERR accessions in the message
-        regex = re.compile(r"(?:SRR|ERR)\d{4,}")
-        SRR_acc = regex.findall(response["messages"][-1].content)
-        # any SRR accessions found?
-        if SRR_acc:
-            break
+    # create the node function
+    async def invoke_SRX2SRR_sragent_agent_node(
+        state: GraphState, attempts: int = 2
+    ) -> Dict[str, Any]:
+        """Invoke the SRAgent to get the SRR accessions for the SRX accession"""
+        # format the message
+        suffix = "Generally, the bigquery agent can handle this task."
+        if state["SRX"].startswith("SRX"):
+            message = f"Find the SRR accessions for {state['SRX']}. Provide a list of SRR accessions. {suffix}"
+        elif state["SRX"].startswith("ERX"):
+            message = f"Find the ERR accessions for {state['SRX']}. Provide a list of ERR accessions. {suffix}"
         else:
-            print(f"Attempt {i + 1} failed. Retrying...")
-            message = "\n".join(
-                [
-                    f'The accession must start with "SRR" or "ERR".',
-                    f"Your previous response was: {response['messages'][-1].content},",
-                    f"which did not contain any valid SRR/ERR accessions.",
-                    "Try again using a different approach.",
-                ]
-            )
-            await asyncio.sleep(1)
+            message = f'The wrong accession was provided: "{state["SRX"]}". The accession must start with "SRR" or "ERR".'
+        # run the agent
+        for i in range(attempts):
+            response = await agent.ainvoke({"messages": [HumanMessage(content=message)]})
+            # extract all SRR/ERR accessions in the message
+            SRR_acc = SRR_REGEX.findall(response["messages"][-1].content)
+            # any SRR accessions found?
+            if SRR_acc:
+                break
+            else:
+                print(f"Attempt {i + 1} failed. Retrying...")
+                message = "\n".join(
+                    [
+                        f'The accession must start with "SRR" or "ERR".',
+                        f"Your previous response was: {response['messages'][-1].content},",
+                        f"which did not contain any valid SRR/ERR accessions.",
+                        "Try again using a different approach.",
+                    ]
+                )
+                await asyncio.sleep(1)
+
+        return {"SRR": list(dict.fromkeys(SRR_acc))}
 
-    return {"SRR": list(set(SRR_acc))}
+    return invoke_SRX2SRR_sragent_agent_node
 
 
-def add2db(state: GraphState, config: RunnableConfig):
+async def add2db(state: GraphState, config: RunnableConfig):
     """Add results to the records database"""
-    # upload SRX metadata to the database
-    data = [
+    if not config.get("configurable", {}).get("use_database"):
+        return
+    # SRX metadata
+    data_srx = [
         {
             "database": state["database"],
             "entrez_id": int(state["entrez_id"]),
@@ -455,30 +484,36 @@ def add2db(state: GraphState, config: RunnableConfig):
             "notes": "Metadata obtained by SRAgent",
         }
     ]
-    data = pd.DataFrame(data)
-    if config.get("configurable", {}).get("use_database"):
-        with db_connect() as conn:
-            db_upsert(data, "srx_metadata", conn)
-
-    # Upload SRR accessions to the database
-    data = []
+    # SRR accessions
+    data_srr = []
     for srr_acc in state["SRR"]:
-        data.append({"srx_accession": state["SRX"], "srr_accession": srr_acc})
-    if (
-        config.get("configurable", {}).get("use_database")
-        and config.get("configurable", {}).get("no_srr") != True
-    ):
-        with db_connect() as conn:
-            db_upsert(pd.DataFrame(data), "srx_srr", conn)
+        data_srr.append({"srx_accession": state["SRX"], "srr_accession": srr_acc})
+
+    if config.get("configurable", {}).get("no_srr") == True:
+        data_srr = []
+
+    # upload to the database without blocking the event loop
+    await asyncio.to_thread(_upload_to_db, data_srx, data_srr)
+
+
+def _upload_to_db(data_srx: List[Dict[str, Any]], data_srr: List[Dict[str, Any]]):
+    """Upsert SRX metadata and SRR accessions, using one connection for both tables"""
+    # psycopg2's connection context manager only ends the transaction; closing() also closes the connection
+    with closing(db_connect()) as conn:
+        db_upsert_rows(data_srx, "srx_metadata", conn)
+        db_upsert_rows(data_srr, "srx_srr", conn)
+
+
+# (field, annotation) pairs reported in the final state
+FINAL_STATE_ITEMS = list(get_metadata_items("all").items())
+FINAL_STATE_TERTIARY_ITEMS = list(get_metadata_items("tertiary").items())
 
 
 def final_state(state: GraphState):
     """Provide the final state"""
     # get the metadata fields
-    metadata = []
-    for k, v in get_metadata_items("all").items():
-        metadata.append(f" - {v}: {state[k]}")
-    for k, v in get_metadata_items("tertiary").items():
+    metadata = [f" - {v}: {state[k]}" for k, v in FINAL_STATE_ITEMS]
+    for k, v in FINAL_STATE_TERTIARY_ITEMS:
         try:
             result = ", ".join(state[k])
         except ValueError:
@@ -489,8 +524,8 @@ def final_state(state: GraphState):
         [
             "# SRX accession: " + state["SRX"],
             " - SRR accessions: " + fmt(state["SRR"]),
+            *metadata,
         ]
-        + metadata
     )
     return {"messages": [HumanMessage(content=message)]}
 
@@ -510,7 +545,7 @@ def create_metadata_graph(db_add: bool = True) -> StateGraph:
     workflow.add_node("sragent_agent_node", create_sragent_agent_node())
     workflow.add_node("get_metadata_node", create_get_metadata_node())
     workflow.add_node("tissue_ontology_node", create_tissue_ontology_node())
-    workflow.add_node("SRX2SRR_node", invoke_SRX2SRR_sragent_agent_node)
+    workflow.add_node("SRX2SRR_node", create_SRX2SRR_sragent_agent_node())
     if db_add:
         workflow.add_node("add2db_node", add2db)
     workflow.add_node("final_state_node", final_state)
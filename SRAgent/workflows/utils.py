@@ -1,5 +1,6 @@
 import os
 import re
+import json
 import random
 import asyncio
 import aiohttp
@@ -191,19 +192,20 @@ async def get_sra_links(
     Returns:
         List of SRA links found
     """
-    params = {"dbfrom": from_db, "db": "sra", "id": entrez_id}
+    # JSON output avoids parsing the XML linkset
+    params = {"dbfrom": from_db, "db": "sra", "id": entrez_id, "retmode": "json"}
 
-    xml_text = await fetch_url(session, ELINK_BASE_URL, params, base_params, semaphore)
-    if not xml_text:
+    json_text = await fetch_url(
+        session, ELINK_BASE_URL, params, base_params, semaphore
+    )
+    if not json_text:
         return []
 
-    root = ET.fromstring(xml_text)
-
     sra_links = []
-    for linkset in root.findall(".//LinkSetDb"):
-        if linkset.find("DbTo") is not None and linkset.find("DbTo").text == "sra":
-            for link in linkset.findall("Link/Id"):
-                sra_links.append(link.text)
+    for linkset in json.loads(json_text).get("linksets", []):
+        for linksetdb in linkset.get("linksetdbs", []):
+            if linksetdb.get("dbto") == "sra":
+                sra_links.extend(str(x) for x in linksetdb.get("links", []))
 
     return sra_links
 
@@ -250,13 +252,14 @@ async def process_id(
 
             if sra_links:
                 # For each SRA link, try to get SRX/ERX accessions
-                all_accessions = []
-                for sra_id in sra_links:
-                    direct_results = await direct_sra_fetch(
-                        session, sra_id, base_params, semaphore
-                    )
-                    if direct_results:
-                        all_accessions.extend(direct_results)
+                # (concurrently; the semaphore caps requests to NCBI)
+                direct_results = await asyncio.gather(
+                    *[
+                        direct_sra_fetch(session, sra_id, base_params, semaphore)
+                        for sra_id in sra_links
+                    ]
+                )
+                all_accessions = [acc for accs in direct_results for acc in accs]
 
                 if all_accessions:
                     return input_id, all_accessions
@@ -147,14 +147,14 @@ async def update_tissue_ontologies(
     ) as progress:
         task = progress.add_task("Processing tissue ontologies...", total=total_records)
 
-        for _, record in target_records.iterrows():
+        for record in target_records.to_dict(orient="records"):
             # Update progress with current SRX accession
             progress.update(
                 task, description=f"Processing {record['srx_accession']}..."
             )
 
             # Get tissue ontology terms
-            ontology_ids = await process_record(record.to_dict(), workflow)
+            ontology_ids = await process_record(record, workflow)
 
             if not ontology_ids:
                 ontology_str = ""
@@ -1,14 +1,22 @@
 #!/usr/bin/env python3
+import io
 import sys
+import csv
 import time
 import random
 import argparse
 import urllib.error
+from xml.etree.ElementTree import iterparse
 from Bio import Entrez
 
+# max number of SRA IDs per efetch request
+EFETCH_BATCH_SIZE = 200
+# HTTP status codes worth retrying (rate limit and transient server errors)
+RETRY_HTTP_CODES = {429, 500, 502, 503, 504}
+
 def retry_with_backoff(func, max_retries=10, initial_delay=1.0, backoff_factor=2.0):
     """
-    Decorator to retry a function with exponential backoff when HTTP 429 errors occur.
+    Decorator to retry a function with exponential backoff when HTTP 429 or transient 5xx errors occur.
     
     Args:
         func: The function to retry
@@ -29,12 +37,11 @@ def retry_with_backoff(func, max_retries=10, initial_delay=1.0, backoff_factor=2
                 time.sleep(0.3)
                 return result
             except urllib.error.HTTPError as e:
-                if e.code == 429 and retries < max_retries:
-                    # Add jitter to prevent synchronized retries
-                    jitter = random.uniform(0, 0.1 * delay)
-                    sleep_time = delay + jitter
+                if e.code in RETRY_HTTP_CODES and retries < max_retries:
+                    # Add jitter (up to half the delay) on top of the full backoff to prevent synchronized retries
+                    sleep_time = delay + random.uniform(0, 0.5 * delay)
                     
-                    print(f"HTTP 429 error: Too many requests. Retrying in {sleep_time:.2f} seconds... "
+                    print(f"HTTP {e.code} error. Retrying in {sleep_time:.2f} seconds... "
                           f"(Attempt {retries+1}/{max_retries})", file=sys.stderr)
                     
                     time.sleep(sleep_time)
@@ -44,6 +51,33 @@ def retry_with_backoff(func, max_retries=10, initial_delay=1.0, backoff_factor=2
                     raise
     return wrapper
 
+def parse_elink_ids(handle) -> list[str]:
+    """
+    Stream-parse an elink XML response and return the linked IDs of the first LinkSetDb.
+    
+    Args:
+        handle: elink response handle (XML)
+        
+    Returns:
+        List of linked IDs (empty if there are no links)
+    """
+    ids = []
+    n_linksetdb = 0
+    in_link = False
+    for event, elem in iterparse(handle, events=("start", "end")):
+        if event == "start":
+            if elem.tag == "LinkSetDb":
+                n_linksetdb += 1
+            elif elem.tag == "Link":
+                in_link = True
+            continue
+        if elem.tag == "Id" and in_link and n_linksetdb == 1:
+            ids.append(elem.text)
+        elif elem.tag == "Link":
+            in_link = False
+        elem.clear()
+    return ids
+
 def fetch_sra_records(
     bioproject_id, email, max_records=None, max_retries=5, initial_delay=1.0, backoff_factor=2.0
     ) -> list[tuple[str, str, str]]:
@@ -66,36 +100,36 @@ def fetch_sra_records(
     # run elink
     print(f"elink of bioproject for: {bioproject_id}", file=sys.stderr)
     handle = elink_with_retry(dbfrom="bioproject", id=bioproject_uid, db="sra")
-    linkset = Entrez.read(handle)
-    if not linkset[0]["LinkSetDb"]:
+    sra_ids = parse_elink_ids(handle)
+    if not sra_ids:
         raise ValueError(f"No linked SRA records found for {bioproject_id}")
-    sra_ids = [link["Id"] for link in linkset[0]["LinkSetDb"][0]["Link"]]
+    # dedup (order-preserving) so each SRA record is only fetched once
+    sra_ids = list(dict.fromkeys(sra_ids))
     print(f"  Total SRA records: {len(sra_ids)}", file=sys.stderr)
 
     # filter to max records
     if max_records is not None:
         sra_ids = sra_ids[:max_records]
 
-    # fetch SRX and SRR accessions and titles
+    # fetch SRX and SRR accessions and titles (batched; efetch accepts comma-separated IDs)
     records = []
-    for sra_id in sra_ids:
-        print(f"efetch of sra for: {sra_id}", file=sys.stderr)
-        handle = efetch_with_retry(db="sra", id=sra_id, rettype="runinfo", retmode="text")
-        lines = handle.read().decode('utf-8').splitlines()
-        # get header
-        header = {x:i for i,x in enumerate(lines[0].split(","))}
-
-        for line in lines[1:]:
-            fields = line.split(",")
-            try:
-                experiment_acc = fields[header["Experiment"]]
-                run_acc = fields[header["Run"]]
-                # Extract the experiment title/name if available, otherwise use a placeholder
-                experiment_name = fields[header["LibraryName"]] if "LibraryName" in header and fields[header["LibraryName"]] else "No title available"
-                records.append((experiment_name, experiment_acc, run_acc))
-            except KeyError as e:
-                print(f"Error extracting data: {e}", file=sys.stderr)
+    for start in range(0, len(sra_ids), EFETCH_BATCH_SIZE):
+        batch = sra_ids[start:start + EFETCH_BATCH_SIZE]
+        print(f"efetch of sra for: {len(batch)} records ({start + 1}-{start + len(batch)})", file=sys.stderr)
+        handle = efetch_with_retry(db="sra", id=",".join(batch), rettype="runinfo", retmode="text")
+        # stream rows from the response instead of reading it all into memory
+        for row in csv.DictReader(io.TextIOWrapper(handle, encoding="utf-8", newline="")):
+            # skip header rows repeated between records
+            if not row.get("Run") or row["Run"] == "Run":
+                continue
+            experiment_acc = row.get("Experiment")
+            run_acc = row["Run"]
+            if not experiment_acc:
+                print(f"Error extracting data: no Experiment for run {run_acc}", file=sys.stderr)
                 continue
+            # Extract the experiment title/name if available, otherwise use a placeholder
+            experiment_name = row.get("LibraryName") or "No title available"
+            records.append((experiment_name, experiment_acc, run_acc))
     print(f"  Total SRA records found: {len(records)}", file=sys.stderr)
     # Sort by experiment accession and then run accession
     return sorted(records, key=lambda x: (x[1], x[2]))
@@ -105,7 +139,7 @@ def main():
     parser.add_argument("bioproject_id", help="NCBI BioProject accession (e.g., PRJNA123456)")
     parser.add_argument("--email", required=True, help="Your email for NCBI Entrez access")
     parser.add_argument("--max-retries", type=int, default=5, 
-                       help="Maximum number of retry attempts for HTTP 429 errors")
+                       help="Maximum number of retry attempts for HTTP 429 and 5xx errors")
     parser.add_argument("--initial-delay", type=float, default=1.0,
                        help="Initial delay in seconds between retries")
     parser.add_argument("--backoff-factor", type=float, default=2.0,
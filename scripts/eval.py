@@ -4,16 +4,21 @@
 import os
 import sys
 import argparse
+from contextlib import closing
 from typing import List, Dict, Literal, Any
 ## 3rd party
 from dotenv import load_dotenv
 import pandas as pd
 from tabulate import tabulate
 from pypika import Query, Table, Criterion, functions as fn
+from psycopg2.extensions import connection
 ## package
 from SRAgent.db.connect import db_connect
 from SRAgent.db.upsert import db_upsert
 
+# max number of mismatch pairs to print per column
+MAX_MISMATCH_ROWS = 20
+
 
 # argparse
 def parse_args():
@@ -67,26 +72,27 @@ def add_suffix(columns: list, suffix: str="_x") -> list:
             result.append(col)  
     return result
 
-def list_datasets() -> pd.DataFrame:
+def list_datasets(conn: connection) -> pd.DataFrame:
     """
     List available datasets in the database.
+    Args:
+        conn: Database connection.
     Return:
         DataFrame  of dataset IDs and record counts.
     """
-    with db_connect() as conn:
-        tbl = Table("eval")
-        stmt = Query \
-            .from_(tbl) \
-            .select(tbl.dataset_id, fn.Count(tbl.dataset_id).as_("record_count")) \
-            .groupby(tbl.dataset_id)
-        datasets = pd.read_sql(str(stmt), conn)
-        return datasets
+    tbl = Table("eval")
+    stmt = Query \
+        .from_(tbl) \
+        .select(tbl.dataset_id, fn.Count(tbl.dataset_id).as_("record_count")) \
+        .groupby(tbl.dataset_id)
+    return pd.read_sql(str(stmt), conn)
 
-def add_update_eval_dataset(csv_file: str) -> None:
+def add_update_eval_dataset(csv_file: str, conn: connection) -> None:
     """
     Add or update an evaluation dataset in the database.
     Args:
         csv_file: Path to the dataset CSV file.
+        conn: Database connection.
     """
     # check if file exists
     if not os.path.exists(csv_file):
@@ -97,66 +103,113 @@ def add_update_eval_dataset(csv_file: str) -> None:
     dataset_id = os.path.splitext(os.path.split(csv_file)[1])[0]
     df["dataset_id"] = dataset_id
     # does dataset exist?
-    existing_datasets = list_datasets()["dataset_id"].tolist()
+    existing_datasets = set(list_datasets(conn)["dataset_id"])
     action = "Updated existing" if dataset_id in existing_datasets else "Added new"
     # add to database
-    with db_connect() as conn:
-        db_upsert(df, "eval", conn)
+    db_upsert(df, "eval", conn)
     print(f"{action} dataset: {dataset_id}")
 
-def load_eval_datasets(eval_datasets: List[str]) -> pd.DataFrame:
+def get_columns(table_name: str, conn: connection) -> List[str]:
+    """
+    Get the column names of a table, in table order.
+    Args:
+        table_name: Name of the table.
+        conn: Database connection.
+    Return:
+        List of column names.
+    """
+    query = """
+    SELECT column_name FROM information_schema.columns
+    WHERE table_name = %s AND table_schema = current_schema()
+    ORDER BY ordinal_position
+    """
+    with conn.cursor() as cur:
+        cur.execute(query, (table_name,))
+        return [row[0] for row in cur.fetchall()]
+
+def load_eval_datasets(eval_datasets: List[str], conn: connection) -> pd.DataFrame:
     """
     Load the evaluation dataset(s) (eval table) and the associated predictions (SRX_metadata table).
     Args:
         eval_datasets: List of evaluation dataset IDs.
+        conn: Database connection.
     Return:
         DataFrame of the evaluation dataset and associated predictions.
     """
-    df = None
-    with db_connect() as conn:
-        tbl_eval = Table("eval")
-        tbl_pred = Table("srx_metadata")
-        stmt = Query \
-            .from_(tbl_eval) \
-            .where(tbl_eval.dataset_id.isin(eval_datasets)) \
-            .join(tbl_pred) \
-            .on(
-                (tbl_eval.database == tbl_pred.database) & 
-                (tbl_eval.entrez_id == tbl_pred.entrez_id) &
-                (tbl_eval.srx_accession == tbl_pred.srx_accession)
-            ) \
-            .select("*") 
-        df = pd.read_sql(str(stmt), conn)
-        df.columns = add_suffix(df.columns, "_pred")
-    # drop "created_at" and "updated_at" columns
-    cols_to_drop = [col for col in df.columns if col.startswith("created_at") or col.startswith("updated_at")]
-    df.drop(cols_to_drop, axis=1, inplace=True)
+    tbl_eval = Table("eval")
+    tbl_pred = Table("srx_metadata")
+    # select all but the "created_at" and "updated_at" columns
+    fields = [
+        tbl.field(col)
+        for tbl, tbl_name in [(tbl_eval, "eval"), (tbl_pred, "srx_metadata")]
+        for col in get_columns(tbl_name, conn)
+        if not col.startswith(("created_at", "updated_at"))
+    ]
+    stmt = Query \
+        .from_(tbl_eval) \
+        .where(tbl_eval.dataset_id.isin(eval_datasets)) \
+        .join(tbl_pred) \
+        .on(
+            (tbl_eval.database == tbl_pred.database) & 
+            (tbl_eval.entrez_id == tbl_pred.entrez_id) &
+            (tbl_eval.srx_accession == tbl_pred.srx_accession)
+        ) \
+        .select(*fields) 
+    df = pd.read_sql(str(stmt), conn)
+    df.columns = add_suffix(df.columns, "_pred")
     return df
 
-def srx_no_eval() -> pd.DataFrame:
+def srx_no_eval(conn: connection, outfile: str, chunksize: int=50000) -> int:
     """
-    Find SRX accessions in the SRX_metadata table that are not in the eval table.
+    Find SRX accessions in the SRX_metadata table that are not in the eval table,
+    and write the records to a CSV file.
+    Rows are streamed via a server-side (named) cursor and written in chunks,
+    so the full result set is never held in memory.
     
+    Args:
+        conn: Database connection.
+        outfile: Output CSV file path.
+        chunksize: Number of records to fetch and write at a time.
     Returns:
-        DataFrame of SRX_metadata records that don't have corresponding eval records.
+        Number of SRX_metadata records that don't have corresponding eval records.
     """
-    with db_connect() as conn:
-        tbl_pred = Table("srx_metadata")
-        tbl_eval = Table("eval")
-        
-        # Subquery to get all srx_accessions in eval table
-        subquery = Query.from_(tbl_eval).select(tbl_eval.srx_accession).distinct()
-        
-        # Main query to get all metadata where srx_accession not in eval table
-        stmt = Query \
-            .from_(tbl_pred) \
-            .where(tbl_pred.srx_accession.notin(subquery)) \
-            .select("*")
-        
-        df = pd.read_sql(str(stmt), conn)
-        
-        print(f"Found {len(df)} SRX accessions in SRX_metadata that are not in the eval table")
-        return df
+    tbl_pred = Table("srx_metadata")
+    tbl_eval = Table("eval")
+    
+    # Subquery to get all srx_accessions in eval table
+    subquery = Query.from_(tbl_eval).select(tbl_eval.srx_accession).distinct().as_("eval_srx")
+    
+    # Main query to get all metadata where srx_accession not in eval table
+    ## anti-join (LEFT JOIN ... IS NULL) instead of NOT IN, which the planner handles poorly
+    ## and which returns nothing if the subquery contains a NULL
+    stmt = Query \
+        .from_(tbl_pred) \
+        .left_join(subquery) \
+        .on(tbl_pred.srx_accession == subquery.srx_accession) \
+        .where(subquery.srx_accession.isnull()) \
+        .select(tbl_pred.star)
+    
+    outdir = os.path.dirname(outfile)
+    if outdir and outdir != ".":
+        os.makedirs(outdir, exist_ok=True)
+    total_count = 0
+    with open(outfile, "w", newline="") as f, conn.cursor(name="srx_no_eval") as cur:
+        cur.itersize = chunksize
+        cur.execute(str(stmt))
+        while True:
+            rows = cur.fetchmany(chunksize)
+            if not rows:
+                break
+            columns = [desc[0] for desc in cur.description]
+            chunk_df = pd.DataFrame(rows, columns=columns)
+            chunk_df.to_csv(f, sep=",", header=(total_count == 0), index=False)
+            total_count += len(rows)
+        # header only, if there are no records
+        if total_count == 0 and cur.description:
+            pd.DataFrame(columns=[desc[0] for desc in cur.description]).to_csv(f, index=False)
+    
+    print(f"Found {total_count} SRX accessions in SRX_metadata that are not in the eval table")
+    return total_count
 
 def eval(
     df: pd.DataFrame, 
@@ -173,30 +226,37 @@ def eval(
     # Get base columns (those without _pred suffix)
     base_cols = [col.replace("_pred", "") for col in df.columns if col.endswith('_pred')]
 
-    # Create comparison for each column pair
+    # Column pairs to compare
+    cols = [col for col in base_cols if col not in exclude_cols and f"{col}_pred" in df.columns]
+    pred_cols = [f"{col}_pred" for col in cols]
+
+    # Compare all column pairs at once (rows x columns mismatch mask)
+    mismatch = df[cols].ne(df[pred_cols].set_axis(cols, axis=1))
+    mismatch_counts = mismatch.sum()
+
     accuracy = {} 
-    idx = set()
-    for col in base_cols:
-        if col in exclude_cols:
-            continue
-        pred_col = f"{col}_pred"
-        if pred_col in df.columns:  # Check if prediction column exists
-            # Compare values and show where they differ
-            mismatches = df[df[col] != df[pred_col]]
-            idx.update(mismatches.index)
-            
-            # Calculate mismatch percentage
-            mismatch_pct = (len(mismatches) / len(df)) * 100
-            accuracy[col] = 100.0 - mismatch_pct
-            
-            print(f"\n#-- {col} --#")
-            print(f"# Total mismatches: {len(mismatches)} ({mismatch_pct:.2f}%)")
-            
-            if len(mismatches) > 0:
-                # Display count of each 
-                print("\n# Mismatches")
-                df_mm = mismatches.groupby([col, pred_col]).size().reset_index(name="count")
-                print(tabulate(df_mm.values, headers=df_mm.columns, tablefmt="github"))
+    for col, pred_col in zip(cols, pred_cols):
+        n_mismatch = int(mismatch_counts[col])
+
+        # Calculate mismatch percentage
+        mismatch_pct = (n_mismatch / len(df)) * 100
+        accuracy[col] = 100.0 - mismatch_pct
+        
+        print(f"\n#-- {col} --#")
+        print(f"# Total mismatches: {n_mismatch} ({mismatch_pct:.2f}%)")
+        
+        if n_mismatch > 0:
+            # Display count of each 
+            print("\n# Mismatches")
+            mismatches = df.loc[mismatch[col], [col, pred_col]]
+            df_mm = mismatches.groupby([col, pred_col]).size().reset_index(name="count")
+            # only pretty-print the most frequent mismatches (all records are written to outfile)
+            n_pairs = len(df_mm)
+            if n_pairs > MAX_MISMATCH_ROWS:
+                df_mm = df_mm.nlargest(MAX_MISMATCH_ROWS, "count")
+            print(tabulate(df_mm.values, headers=df_mm.columns, tablefmt="github"))
+            if n_pairs > MAX_MISMATCH_ROWS:
+                print(f"# ... {n_pairs - MAX_MISMATCH_ROWS} less frequent mismatch pairs not shown")
 
     # convert to dataframe
     accuracy = pd.DataFrame(accuracy.items(), columns=["column", "accuracy_percent"])
@@ -214,7 +274,7 @@ def eval(
 
     # print out the mismatch records
     print("\n#-- Mismatch Records --#")
-    df_wrong = df.iloc[list(idx)]
+    df_wrong = df[mismatch.any(axis=1)]
     outdir = os.path.dirname(outfile)
     if outdir and outdir != ".":
         os.makedirs(outdir, exist_ok=True)
@@ -238,37 +298,36 @@ def main(args):
         os.environ["DYNACONF"] = args.tenant
     print(f"Using database tenant: {args.tenant}")
 
-    # add evaluation dataset
-    if args.add_dataset:
-        add_update_eval_dataset(args.add_dataset)
-        return None
+    # one database connection for all queries in this run
+    with closing(db_connect()) as conn:
+        # add evaluation dataset
+        if args.add_dataset:
+            add_update_eval_dataset(args.add_dataset, conn)
+            return None
 
-    # list available datasets
-    if args.list_datasets:
-        print(list_datasets())
-        return None
+        # list available datasets
+        if args.list_datasets:
+            print(list_datasets(conn))
+            return None
     
-    # find missing SRX accessions
-    if args.srx_no_eval:
-        srx_missing_eval = srx_no_eval()
-        outdir = os.path.dirname(args.srx_no_eval)
-        if outdir and outdir != ".":
-            os.makedirs(outdir, exist_ok=True)
-        srx_missing_eval.to_csv(args.srx_no_eval, sep=",", index=False)
-        print(f"Saved SRX records lacking eval records to: {args.srx_no_eval}")
-        return None
+        # find missing SRX accessions
+        if args.srx_no_eval:
+            srx_no_eval(conn, args.srx_no_eval)
+            print(f"Saved SRX records lacking eval records to: {args.srx_no_eval}")
+            return None
 
-    # evaluation
-    if not args.eval_datasets:
-        print("Please provide an evaluation dataset ID (use --list-datasets to see available datasets)")
-        return None
-    missing_eval_datasets = [x for x in args.eval_datasets if x not in list_datasets()["dataset_id"].tolist()]
-    if missing_eval_datasets:
-        for missing in missing_eval_datasets:
-            print(f"Dataset not found: {missing}")
-        return None
-    df = load_eval_datasets(args.eval_datasets)
-    eval(df, outfile=args.outfile)
+        # evaluation
+        if not args.eval_datasets:
+            print("Please provide an evaluation dataset ID (use --list-datasets to see available datasets)")
+            return None
+        existing_datasets = set(list_datasets(conn)["dataset_id"])
+        missing_eval_datasets = [x for x in args.eval_datasets if x not in existing_datasets]
+        if missing_eval_datasets:
+            for missing in missing_eval_datasets:
+                print(f"Dataset not found: {missing}")
+            return None
+        df = load_eval_datasets(args.eval_datasets, conn)
+        eval(df, outfile=args.outfile)
 
 
 # Example usage
@@ -9,21 +9,23 @@ to retrieve the corresponding SRA project accessions (SRP).
 # import
 ## batteries
 from __future__ import annotations
+import io
 import os
 import sys
 import argparse
 import logging
+import concurrent.futures
 from typing import List, Optional
 
 ## 3rd party
 import pandas as pd
 from google.cloud import bigquery
+from psycopg2.extras import execute_values
 from dotenv import load_dotenv
 
 ## package (assuming SRAgent is installed or in path)
 try:
     from SRAgent.db.connect import db_connect
-    from SRAgent.tools.utils import join_accs, to_json
 except ImportError:
     print("Error: SRAgent package not found. Please install or add to PYTHONPATH.")
     sys.exit(1)
@@ -54,65 +56,95 @@ def get_srx_accessions_from_db(
     if limit:
         query += f" LIMIT {limit}"
 
-    # Execute query
+    # Bulk-read via COPY (one text column; much faster than row-mode fetchall)
+    buf = io.BytesIO()
     cursor = conn.cursor()
-    cursor.execute(query)
-    results = cursor.fetchall()
+    cursor.copy_expert(f"COPY ({query}) TO STDOUT", buf)
     cursor.close()
 
-    srx_accessions = [row[0] for row in results if row[0]]
+    # COPY writes NULL as \N
+    srx_accessions = [
+        x for x in buf.getvalue().decode().splitlines() if x and x != "\\N"
+    ]
     logger.info(f"Found {len(srx_accessions)} SRX accessions")
 
     return srx_accessions
 
 
+def _query_bigquery_batch(
+    client: bigquery.Client, query: str, batch: List[str]
+) -> List[dict]:
+    """Run the project accession query for one batch of SRX accessions.
+
+    Args:
+        client: BigQuery client (shared across threads)
+        query: Parameterized query; accessions are bound via @accs
+        batch: SRX accessions for this batch
+
+    Returns:
+        List of result rows as dicts
+    """
+    job_config = bigquery.QueryJobConfig(
+        query_parameters=[bigquery.ArrayQueryParameter("accs", "STRING", batch)]
+    )
+    query_job = client.query(query, job_config=job_config)
+    return [dict(row) for row in query_job.result()]
+
+
 def get_project_accessions_from_bigquery(
-    srx_accessions: List[str], batch_size: int = 100
+    srx_accessions: List[str], batch_size: int = 10000, max_workers: int = 8
 ) -> pd.DataFrame:
     """Query BigQuery to get SRA project accessions for SRX accessions.
 
     Args:
         srx_accessions: List of SRX accession strings
         batch_size: Number of accessions to query at once
+        max_workers: Number of batch queries to run concurrently
 
     Returns:
         DataFrame with columns: experiment, sra_study, bioproject
     """
     logger.info(f"Querying BigQuery for {len(srx_accessions)} SRX accessions")
 
-    # Initialize BigQuery client
+    # Initialize BigQuery client (thread-safe; shared by all batches)
     client = bigquery.Client()
 
     all_results = []
 
-    # Process in batches
-    for i in range(0, len(srx_accessions), batch_size):
-        batch = srx_accessions[i : i + batch_size]
-        logger.info(f"Processing batch {i // batch_size + 1} ({len(batch)} accessions)")
-
-        # Build query
-        query = f"""
-        SELECT DISTINCT
-            m.experiment,
-            m.sra_study,
-            m.bioproject
-        FROM `nih-sra-datastore.sra.metadata` as m
-        WHERE m.experiment IN ({join_accs(batch)})
-        """
-
-        try:
-            # Execute query
-            query_job = client.query(query)
-            results = query_job.result()
-
-            # Convert to list of dicts
-            batch_results = [dict(row) for row in results]
-            all_results.extend(batch_results)
-            logger.info(f"Retrieved {len(batch_results)} records from this batch")
+    # Parameterized query; the accessions are bound per batch via @accs
+    query = """
+    SELECT DISTINCT
+        m.experiment,
+        m.sra_study,
+        m.bioproject
+    FROM `nih-sra-datastore.sra.metadata` as m
+    WHERE m.experiment IN UNNEST(@accs)
+    """
 
-        except Exception as e:
-            logger.error(f"Error querying batch: {e}")
-            continue
+    # Process batches concurrently
+    batches = [
+        srx_accessions[i : i + batch_size]
+        for i in range(0, len(srx_accessions), batch_size)
+    ]
+    logger.info(f"Submitting {len(batches)} batches ({max_workers} concurrent)")
+    ## results are collected per batch and combined in submission order, so the output is reproducible
+    batch_results = [[] for _ in batches]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(_query_bigquery_batch, client, query, batch): idx
+            for idx, batch in enumerate(batches)
+        }
+        for future in concurrent.futures.as_completed(futures):
+            idx = futures[future]
+            try:
+                batch_results[idx] = future.result()
+                logger.info(
+                    f"Retrieved {len(batch_results[idx])} records from batch {idx + 1}"
+                )
+            except Exception as e:
+                logger.error(f"Error querying batch {idx + 1}: {e}")
+    for results in batch_results:
+        all_results.extend(results)
 
     # Convert to DataFrame
     df = pd.DataFrame(all_results)
@@ -122,7 +154,7 @@ def get_project_accessions_from_bigquery(
 
 
 def update_database_with_projects(
-    conn, df: pd.DataFrame, table_name: str = "srx_metadata"
+    conn, df: pd.DataFrame, table_name: str = "srx_metadata", page_size: int = 1000
 ) -> None:
     """Update the PostgreSQL database with SRA project accessions.
 
@@ -130,6 +162,7 @@ def update_database_with_projects(
         conn: Database connection object
         df: DataFrame with experiment, sra_study, bioproject columns
         table_name: Name of the table to update
+        page_size: Number of records per UPDATE statement
     """
     logger.info(f"Updating table {table_name} with project accessions")
 
@@ -156,33 +189,51 @@ def update_database_with_projects(
         cursor.close()
         return
 
-    # Update records
-    updated_count = 0
-    for _, row in df.iterrows():
-        srx = row["experiment"]
-
-        # Build update statement and values
-        set_clause = ", ".join([f"{col} = %s" for col in update_cols])
-
-        # Map DataFrame columns to database columns
-        col_mapping = {"sra_study": "sra_study", "bioproject": "bioproject"}
-        values = [row.get(col_mapping.get(col, col)) for col in update_cols]
-        values.append(srx)
+    # Update records in batches: one UPDATE ... FROM (VALUES ...) per page
+    set_clause = ", ".join([f"{col} = v.{col}" for col in update_cols])
+    update_query = f"""
+        UPDATE {table_name} AS t
+        SET {set_clause}, updated_at = CURRENT_TIMESTAMP
+        FROM (VALUES %s) AS v(experiment, {", ".join(update_cols)})
+        WHERE t.srx_accession = v.experiment
+    """
+    df_update = df[["experiment"] + update_cols]
+
+    # One row per experiment (otherwise PostgreSQL applies an arbitrary duplicate):
+    ## keep the row with the most non-null values; ties are broken by the values' sort order
+    n_values = df_update[update_cols].notna().sum(axis=1).rename("n_values")
+    n_rows = len(df_update)
+    df_update = (
+        pd.concat([df_update, n_values], axis=1)
+        .sort_values(
+            ["experiment", "n_values"] + update_cols,
+            ascending=[True, False] + [True] * len(update_cols),
+            na_position="last",
+        )
+        .drop_duplicates(subset="experiment", keep="first")
+        .drop(columns="n_values")
+    )
+    if len(df_update) < n_rows:
+        logger.warning(
+            f"Dropped {n_rows - len(df_update)} duplicate experiment records before updating"
+        )
 
-        update_query = f"""
-            UPDATE {table_name}
-            SET {set_clause}, updated_at = CURRENT_TIMESTAMP
-            WHERE srx_accession = %s
-        """
+    df_update = df_update.astype(object).where(df_update.notna(), None)
+    rows = list(df_update.itertuples(index=False, name=None))
 
+    updated_count = 0
+    for i in range(0, len(rows), page_size):
+        batch = rows[i : i + page_size]
         try:
-            cursor.execute(update_query, values)
+            execute_values(cursor, update_query, batch, page_size=len(batch))
+            # commit per batch, so a failed batch only rolls back itself
+            conn.commit()
             updated_count += cursor.rowcount
         except Exception as e:
-            logger.error(f"Error updating SRX {srx}: {e}")
+            logger.error(f"Error updating batch {i // page_size + 1}: {e}")
+            conn.rollback()
             continue
 
-    conn.commit()
     cursor.close()
     logger.info(f"Updated {updated_count} records in the database")
 
@@ -217,10 +268,17 @@ def main():
     parser.add_argument(
         "--batch-size",
         type=int,
-        default=100,
+        default=10000,
         help="Number of accessions to query at once via SRA BigQuery",
     )
 
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=8,
+        help="Number of BigQuery batch queries to run concurrently",
+    )
+
     parser.add_argument(
         "--output",
         type=str,
@@ -267,7 +325,9 @@ def main():
 
             # Query BigQuery for project accessions
             df = get_project_accessions_from_bigquery(
-                srx_accessions, batch_size=args.batch_size
+                srx_accessions,
+                batch_size=args.batch_size,
+                max_workers=args.max_workers,
             )
 
             if df.empty:
@@ -1,6 +1,8 @@
 import asyncio
 import pytest
 
+from langchain_core.messages import AIMessage
+
 from SRAgent.agents import papers
 
 
@@ -36,7 +38,7 @@ async def test_process_accession_with_downloads(monkeypatch, tmp_path):
                 }
             }
 
-    async def fake_download_batch(dois, output_dir, api_key=None, email=None):
+    async def fake_download_batch(dois, output_dir, api_key=None, email=None, max_concurrency=5):
         fake_result = {}
         for pmid, doi in dois.items():
             fake_result[pmid] = {
@@ -63,3 +65,232 @@ async def test_process_accession_with_downloads(monkeypatch, tmp_path):
     # DOI without value should be skipped for download
     assert "87654321" not in result["downloads"]
     assert "downloaded 1/1" in result["summary"]
+
+
+@pytest.mark.asyncio
+async def test_process_accession_reuses_provided_agent(monkeypatch):
+    """A provided agent is used instead of creating a new one."""
+
+    class DummyAgent:
+        def __init__(self):
+            self.calls = 0
+
+        async def ainvoke(self, *args, **kwargs):
+            self.calls += 1
+            return {"structured_response": {"publications": []}}
+
+    def fail_create(return_tool=False):
+        raise AssertionError("create_papers_agent should not be called")
+
+    monkeypatch.setattr(papers, "create_papers_agent", fail_create)
+
+    agent = DummyAgent()
+    for accession in ["SRX000003", "SRX000004"]:
+        result = await papers.process_accession(accession, papers_agent=agent)
+        assert result["summary"] == "No publications found"
+    assert agent.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_download_papers_batch(monkeypatch, tmp_path):
+    """Downloads run per DOI; missing DOIs are skipped and order is kept."""
+
+    def fake_download(doi, output_path, api_key=None, email=None):
+        if doi == "10.1000/fail":
+            return "Failed to download paper"
+        return f"Successfully downloaded from CORE to {output_path}"
+
+    monkeypatch.setattr(papers, "download_paper_by_doi", fake_download)
+
+    dois = {"1": "10.1000/ok", "2": None, "3": "10.1000/fail"}
+    results = await papers._download_papers_batch(dois, str(tmp_path))
+
+    assert list(results.keys()) == ["1", "2", "3"]
+    assert results["1"]["status"] == "success"
+    assert results["1"]["path"].endswith("10.1000_ok.pdf")
+    assert results["2"]["status"] == "skipped"
+    assert results["3"]["status"] == "failed"
+
+
+@pytest.mark.asyncio
+async def test_papers_agent_skips_react_agent_when_pubmed_ids_found(monkeypatch):
+    """The fixed sub-agent path is used; the ReAct agent is only a fallback."""
+
+    class FailAgent:
+        async def ainvoke(self, *args, **kwargs):
+            raise AssertionError("react agent should not be called")
+
+    async def fake_find(accession, esearch_agent, config):
+        return ["12345678"]
+
+    async def fake_extract(pubmed_ids, efetch_agent, esummary_agent, config, semaphore=None):
+        return {pmid: "10.1000/example" for pmid in pubmed_ids}
+
+    monkeypatch.setattr(papers, "set_model", lambda **kwargs: None)
+    for name in ["esearch", "esummary", "efetch", "elink"]:
+        monkeypatch.setattr(papers, f"create_{name}_agent", lambda: None)
+    monkeypatch.setattr(papers, "create_react_agent", lambda **kwargs: FailAgent())
+    monkeypatch.setattr(papers, "_find_publications_for_accession", fake_find)
+    monkeypatch.setattr(papers, "_extract_dois_from_pubmed", fake_extract)
+
+    async def fake_download_batch(dois, output_dir, api_key=None, email=None, max_concurrency=5):
+        return {}
+
+    monkeypatch.setattr(papers, "_download_papers_batch", fake_download_batch)
+
+    agent = papers.create_papers_agent(return_tool=False)
+    result = await papers.process_accession("SRX000005", papers_agent=agent)
+
+    assert result["dois"] == {"12345678": "10.1000/example"}
+
+
+@pytest.mark.asyncio
+async def test_papers_agent_fallback_timeout(monkeypatch):
+    """A slow ReAct fallback is reported as an error instead of hanging."""
+
+    class SlowAgent:
+        async def ainvoke(self, *args, **kwargs):
+            await asyncio.sleep(10)
+
+    async def fake_find(accession, esearch_agent, config):
+        return None
+
+    monkeypatch.setattr(papers, "set_model", lambda **kwargs: None)
+    for name in ["esearch", "esummary", "efetch", "elink"]:
+        monkeypatch.setattr(papers, f"create_{name}_agent", lambda: None)
+    monkeypatch.setattr(papers, "create_react_agent", lambda **kwargs: SlowAgent())
+    monkeypatch.setattr(papers, "_find_publications_for_accession", fake_find)
+    monkeypatch.setattr(papers, "REACT_AGENT_TIMEOUT", 0.01)
+
+    agent = papers.create_papers_agent(return_tool=False)
+    result = await papers.process_accession("SRX000006", papers_agent=agent)
+
+    assert result["pubmed_ids"] == []
+    assert "timed out" in result["error"]
+    assert result["summary"] == f"Error: {result['error']}"
+
+
+def _patch_fixed_sequence(monkeypatch, fallback, fake_elink, fake_read):
+    """Patch the sub-agents, the ReAct fallback, and Entrez for the papers graph."""
+
+    class EsearchAgent:
+        async def ainvoke(self, *args, **kwargs):
+            return {"messages": [AIMessage(content="The Entrez ID for SRX000007 is 12345678")]}
+
+    monkeypatch.setattr(papers, "set_model", lambda **kwargs: None)
+    monkeypatch.setattr(papers, "set_entrez_access", lambda: None)
+    for name in ["esummary", "efetch", "elink"]:
+        monkeypatch.setattr(papers, f"create_{name}_agent", lambda: None)
+    monkeypatch.setattr(papers, "create_esearch_agent", lambda: EsearchAgent())
+    monkeypatch.setattr(papers, "create_react_agent", lambda **kwargs: fallback)
+    monkeypatch.setattr(papers.Entrez, "elink", fake_elink)
+    monkeypatch.setattr(papers.Entrez, "read", fake_read)
+
+
+class FallbackAgent:
+    def __init__(self):
+        self.calls = 0
+
+    async def ainvoke(self, *args, **kwargs):
+        self.calls += 1
+        return {
+            "structured_response": {"accession": "SRX000007", "publications": []},
+            "messages": [AIMessage(content="No publications found")],
+        }
+
+
+class DummyHandle:
+    def close(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_papers_agent_no_fallback_when_elink_has_no_pubmed_ids(monkeypatch):
+    """An elink record with no PubMed links ends with an empty result; the ReAct agent is not run."""
+
+    def fake_elink(**kwargs):
+        assert kwargs["id"] == "12345678"
+        return DummyHandle()
+
+    # elink record echoing the query ID, with no linked PubMed IDs
+    def fake_read(handle):
+        return [{"DbFrom": "sra", "IdList": ["12345678"], "LinkSetDb": []}]
+
+    fallback = FallbackAgent()
+    _patch_fixed_sequence(monkeypatch, fallback, fake_elink, fake_read)
+
+    agent = papers.create_papers_agent(return_tool=False)
+    result = await papers.process_accession("SRX000007", papers_agent=agent)
+
+    assert fallback.calls == 0
+    assert result["pubmed_ids"] == []
+    assert result["summary"] == "No publications found"
+
+
+@pytest.mark.asyncio
+async def test_papers_agent_fallback_when_elink_fails(monkeypatch):
+    """A failed elink query falls back to the ReAct agent."""
+
+    def fake_elink(**kwargs):
+        raise OSError("connection reset")
+
+    def fake_read(handle):
+        raise AssertionError("Entrez.read should not be called")
+
+    fallback = FallbackAgent()
+    _patch_fixed_sequence(monkeypatch, fallback, fake_elink, fake_read)
+
+    agent = papers.create_papers_agent(return_tool=False)
+    result = await papers.process_accession("SRX000007", papers_agent=agent)
+
+    assert fallback.calls == 1
+    assert result["summary"] == "No publications found"
+
+
+@pytest.mark.asyncio
+async def test_extract_dois_concurrency_is_bounded(monkeypatch):
+    """No more than ENTREZ_MAX_CONCURRENCY PubMed IDs are queried at once."""
+
+    class CountingAgent:
+        def __init__(self):
+            self.active = 0
+            self.max_active = 0
+
+        async def ainvoke(self, *args, **kwargs):
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            await asyncio.sleep(0.01)
+            self.active -= 1
+            return {"messages": [AIMessage(content="DOI: 10.1000/example")]}
+
+    monkeypatch.setattr(papers, "ENTREZ_MAX_CONCURRENCY", 2)
+    efetch_agent = CountingAgent()
+    pubmed_ids = [str(10000000 + i) for i in range(6)]
+
+    dois = await papers._extract_dois_from_pubmed(pubmed_ids, efetch_agent, None, {})
+
+    assert list(dois.keys()) == pubmed_ids
+    assert all(doi == "10.1000/example" for doi in dois.values())
+    assert efetch_agent.max_active == 2
+
+
+@pytest.mark.asyncio
+async def test_download_papers_batch_dedupes_dois(monkeypatch, tmp_path):
+    """PubMed IDs sharing a DOI trigger a single download."""
+
+    calls = []
+
+    def fake_download(doi, output_path, api_key=None, email=None):
+        calls.append(doi)
+        return f"Successfully downloaded from CORE to {output_path}"
+
+    monkeypatch.setattr(papers, "download_paper_by_doi", fake_download)
+
+    dois = {"1": "10.1000/shared", "2": "10.1000/shared", "3": "10.1000/other"}
+    results = await papers._download_papers_batch(dois, str(tmp_path), max_concurrency=1)
+
+    assert sorted(calls) == ["10.1000/other", "10.1000/shared"]
+    assert list(results.keys()) == ["1", "2", "3"]
+    assert results["1"]["status"] == results["2"]["status"] == "success"
+    assert results["1"]["path"] == results["2"]["path"]
+    assert results["3"]["path"].endswith("10.1000_other.pdf")
@@ -0,0 +1,48 @@
+import pytest
+from unittest.mock import patch, MagicMock
+from SRAgent.db.upsert import db_upsert_rows
+
+
+@pytest.fixture
+def mock_conn():
+    """Mock psycopg2 connection"""
+    return MagicMock()
+
+
+def test_db_upsert_rows_empty(mock_conn):
+    """Test that no query is run for an empty list of rows"""
+    with patch("SRAgent.db.upsert.get_unique_columns") as mock_unique:
+        db_upsert_rows([], "srx_srr", mock_conn)
+        mock_unique.assert_not_called()
+        mock_conn.cursor.assert_not_called()
+
+
+def test_db_upsert_rows_dedup(mock_conn):
+    """Test that duplicate rows (by unique columns) are dropped, keeping the first"""
+    rows = [
+        {"srx_accession": "SRX1", "srr_accession": "SRR1"},
+        {"srx_accession": "SRX1", "srr_accession": "SRR2"},
+        {"srx_accession": "SRX1", "srr_accession": "SRR1"},
+    ]
+    with patch(
+        "SRAgent.db.upsert.get_unique_columns",
+        return_value=["srx_accession", "srr_accession"],
+    ), patch("SRAgent.db.upsert.execute_values") as mock_exec:
+        db_upsert_rows(rows, "srx_srr", mock_conn)
+        _, stmt, values = mock_exec.call_args[0]
+        assert values == [("SRX1", "SRR1"), ("SRX1", "SRR2")]
+        assert "ON CONFLICT (srx_accession, srr_accession) DO NOTHING" in stmt
+        mock_conn.commit.assert_called_once()
+
+
+def test_db_upsert_rows_update(mock_conn):
+    """Test that non-unique columns are updated on conflict and 'id' is excluded"""
+    rows = [{"id": 1, "srx_accession": "SRX1", "organism": "human"}]
+    with patch(
+        "SRAgent.db.upsert.get_unique_columns", return_value=["srx_accession"]
+    ), patch("SRAgent.db.upsert.execute_values") as mock_exec:
+        db_upsert_rows(rows, "srx_metadata", mock_conn)
+        _, stmt, values = mock_exec.call_args[0]
+        assert values == [("SRX1", "human")]
+        assert "INSERT INTO srx_metadata (srx_accession, organism)" in stmt
+        assert "DO UPDATE SET organism = EXCLUDED.organism" in stmt
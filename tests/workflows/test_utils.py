@@ -61,25 +61,25 @@ def sample_summary_xml():
 
 
 @pytest.fixture
-def sample_elink_xml():
-    """Sample elink XML response fixture"""
+def sample_elink_json():
+    """Sample elink JSON response fixture"""
     return '''
-    <eLinkResult>
-        <LinkSet>
-            <IdList>
-                <Id>123456</Id>
-            </IdList>
-            <LinkSetDb>
-                <DbTo>sra</DbTo>
-                <Link>
-                    <Id>987654</Id>
-                </Link>
-                <Link>
-                    <Id>876543</Id>
-                </Link>
-            </LinkSetDb>
-        </LinkSet>
-    </eLinkResult>
+    {
+        "header": {"type": "elink", "version": "0.3"},
+        "linksets": [
+            {
+                "dbfrom": "nucleotide",
+                "ids": ["123456"],
+                "linksetdbs": [
+                    {
+                        "dbto": "sra",
+                        "linkname": "nucleotide_sra",
+                        "links": ["987654", "876543"]
+                    }
+                ]
+            }
+        ]
+    }
     '''
 
 
@@ -166,10 +166,10 @@ async def test_try_sra_summary(sample_summary_xml):
 
 
 @pytest.mark.asyncio
-async def test_get_sra_links(sample_elink_xml):
+async def test_get_sra_links(sample_elink_json):
     """Test get_sra_links function with mocked fetch_url"""
-    # Create a mock for fetch_url that returns the fixture XML response
-    mock_fetch = AsyncMock(return_value=sample_elink_xml)
+    # Create a mock for fetch_url that returns the fixture JSON response
+    mock_fetch = AsyncMock(return_value=sample_elink_json)
     
     # Create mock session and semaphore
     session = AsyncMock()
@@ -187,6 +187,7 @@ async def test_get_sra_links(sample_elink_xml):
         assert 'elink.fcgi' in call_args[0][1]  # Check URL is elink
         assert call_args[0][2].get('dbfrom') == 'nucleotide'  # Check dbfrom param
         assert call_args[0][2].get('id') == '123456'  # Check id param is correct
+        assert call_args[0][2].get('retmode') == 'json'  # Check JSON output requested
         
         # Verify the extracted SRA IDs are correct
         assert "987654" in result
@@ -289,7 +290,7 @@ async def test_entrez_id_to_srx_summary_method(sample_summary_xml):
 
 
 @pytest.mark.asyncio
-async def test_entrez_id_to_srx_elink_method(sample_elink_xml, sample_xml_response):
+async def test_entrez_id_to_srx_elink_method(sample_elink_json, sample_xml_response):
     """Test entrez_id_to_srx with elink method"""
     # Mock the functions with updated signatures to simulate elink path
     